@@ -0,0 +1,144 @@
+# qflashlight - Simple Qt-based fullscreen flashlight
+# Copyright (C) 2017 Ingo Ruhnke <grumbel@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Compare the cost of running --command through subprocess.getoutput(),
+a fresh QProcess per run and the persistent shell co-process
+
+    python3 -m benchmarks.bench_command [-C CMD] [-d SECONDS]
+"""
+
+from typing import Any, Callable
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QCoreApplication, QTimer  # noqa: E402
+
+from qflashlight.text_generator import TextGenerator  # noqa: E402
+
+
+def cpu_time() -> float:
+    """CPU time used by this process and its reaped children"""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def measure(name: str, runner: Callable[[], int]) -> dict[str, Any]:
+    cpu_start = cpu_time()
+    wall_start = time.perf_counter()
+    runs = runner()
+    wall = time.perf_counter() - wall_start
+    cpu = cpu_time() - cpu_start
+
+    return {
+        "name": name,
+        "runs": runs,
+        "runs_per_sec": runs / wall,
+        "cpu_ms_per_run": cpu * 1000 / runs if runs else None,
+    }
+
+
+def run_getoutput(command: str, duration: float) -> int:
+    runs = 0
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        subprocess.getoutput(command)
+        runs += 1
+    return runs
+
+
+def run_text_generator(command: str, duration: float, persistent_shell: bool) -> int:
+    qapp = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    runs = 0
+    running = True
+
+    def on_text(text: str) -> None:
+        nonlocal runs
+        runs += 1
+        # restart the command as soon as it finished, a refresh timer
+        # would add its own overhead to the measurement
+        if running:
+            QTimer.singleShot(0, generator.start)
+
+    generator = TextGenerator(command, None, on_text, persistent_shell=persistent_shell)
+    generator.start()
+    QTimer.singleShot(int(duration * 1000), qapp.quit)
+    qapp.exec_()
+    running = False
+    generator.stop()
+
+    # let the killed processes finish so they show up in RUSAGE_CHILDREN
+    QTimer.singleShot(100, qapp.quit)
+    qapp.exec_()
+
+    return runs
+
+
+def measure_latency(name: str, command: str, duration: float, persistent_shell: bool) -> dict[str, Any]:
+    """Time from the scheduled refresh to the text reaching the callback"""
+    qapp = QCoreApplication.instance() or QCoreApplication(sys.argv)
+
+    generator = TextGenerator(command, 0.05, lambda text: None, persistent_shell=persistent_shell)
+    generator.start()
+    QTimer.singleShot(int(duration * 1000), qapp.quit)
+    qapp.exec_()
+    generator.stop()
+
+    latency = generator.stats()["update_latency_ms"]
+    return {
+        "name": name,
+        "latency_mean_ms": latency.mean(),
+        "latency_max_ms": latency.max(),
+    }
+
+
+def run_benchmark(command: str, duration: float) -> list[dict[str, Any]]:
+    return [
+        measure("getoutput", lambda: run_getoutput(command, duration)),
+        measure("qprocess", lambda: run_text_generator(command, duration, persistent_shell=False)),
+        measure("persistent_shell", lambda: run_text_generator(command, duration, persistent_shell=True)),
+        measure_latency("qprocess_latency", command, duration, persistent_shell=False),
+        measure_latency("persistent_shell_latency", command, duration, persistent_shell=True),
+    ]
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark --command execution strategies")
+    parser.add_argument("-C", "--command", metavar="CMD", type=str, default="cat /proc/loadavg",
+                        help="Command to run (default: 'cat /proc/loadavg')")
+    parser.add_argument("-d", "--duration", metavar="SECONDS", type=float, default=3.0,
+                        help="Time spent on each strategy (default: 3.0)")
+    args = parser.parse_args(argv[1:])
+
+    results = run_benchmark(args.command, args.duration)
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
+
+
+# EOF #
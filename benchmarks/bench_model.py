@@ -0,0 +1,95 @@
+# qflashlight - Simple Qt-based fullscreen flashlight
+# Copyright (C) 2017 Ingo Ruhnke <grumbel@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Measure how many updates per second FlashlightModel handles with an
+Application attached, including the deferred repaints they cause
+
+    python3 -m benchmarks.bench_model [-n UPDATES]
+"""
+
+from typing import Any, Callable
+
+import argparse
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QRect  # noqa: E402
+from PyQt5.QtGui import QColor  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from qflashlight.application import Application  # noqa: E402
+
+
+def measure_updates(name: str, updates: int, update: Callable[[int], None]) -> dict[str, Any]:
+    qapp = QApplication.instance()
+    assert qapp is not None
+
+    start = time.perf_counter()
+    for i in range(updates):
+        update(i)
+        # one event loop iteration per update, like updates arriving from a source
+        qapp.processEvents()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "name": name,
+        "updates_per_sec": updates / elapsed,
+    }
+
+
+def run_benchmark(updates: int) -> list[dict[str, Any]]:
+    qapp = QApplication.instance() or QApplication(sys.argv)
+
+    app = Application()
+    app.set_window_geometry(QRect(0, 0, 640, 480))
+    app.show()
+    qapp.processEvents()
+
+    model = app.flashlight_model()
+    colors = [QColor("red"), QColor("blue")]
+    results = [
+        measure_updates("set_text", updates, lambda i: model.set_text(str(i))),
+        measure_updates("set_text_unchanged", updates, lambda i: model.set_text("unchanged")),
+        measure_updates("set_background_color", updates,
+                        lambda i: model.set_background_color(colors[i % 2])),
+    ]
+
+    app.close()
+    qapp.processEvents()
+
+    return results
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark FlashlightModel update throughput")
+    parser.add_argument("-n", "--updates", metavar="N", type=int, default=2000,
+                        help="Number of updates per measurement (default: 2000)")
+    args = parser.parse_args(argv[1:])
+
+    json.dump(run_benchmark(args.updates), sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
+
+
+# EOF #
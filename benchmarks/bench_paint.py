@@ -0,0 +1,116 @@
+# qflashlight - Simple Qt-based fullscreen flashlight
+# Copyright (C) 2017 Ingo Ruhnke <grumbel@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Measure the cost of FlashlightWidget.paintEvent() for different
+text sizes, fonts and window geometries
+
+    python3 -m benchmarks.bench_paint [-n PAINTS]
+"""
+
+from typing import Any
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QRect  # noqa: E402
+from PyQt5.QtGui import QFont  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from qflashlight.application import Application  # noqa: E402
+
+
+TEXTS = {
+    "empty": "",
+    "short": "12:34",
+    "1k": "\n".join(f"line {i:3d}: the quick brown fox" for i in range(32)),
+    "16k": "\n".join(f"line {i:4d}: the quick brown fox jumps over the lazy dog" for i in range(280)),
+}
+
+FONTS = {
+    "default": "",
+    "monospace": "Monospace",
+    "serif": "Serif",
+}
+
+GEOMETRIES = {
+    "320x240": (320, 240),
+    "1920x1080": (1920, 1080),
+    "3840x2160": (3840, 2160),
+}
+
+
+def measure_paints(app: Application, paints: int, change_text: bool) -> float:
+    """Milliseconds per synchronous repaint"""
+    widget = app.flashlight_widget()
+    model = app.flashlight_model()
+    text = model.text()
+
+    start = time.perf_counter()
+    for i in range(paints):
+        if change_text:
+            # a different text every frame defeats the layout cache
+            model.set_text(text + (" " if i % 2 else ""))
+        widget.repaint()
+    return (time.perf_counter() - start) * 1000 / paints
+
+
+def run_benchmark(paints: int) -> list[dict[str, Any]]:
+    qapp = QApplication.instance() or QApplication(sys.argv)
+    results = []
+
+    for (text_name, text), (font_name, font), (geometry_name, (width, height)) in \
+            itertools.product(TEXTS.items(), FONTS.items(), GEOMETRIES.items()):
+        app = Application()
+        app.set_font(QFont(font))
+        app.set_text(text)
+        app.set_window_geometry(QRect(0, 0, width, height))
+        app.show()
+        qapp.processEvents()
+
+        results.append({
+            "name": f"{text_name}/{font_name}/{geometry_name}",
+            "cached_ms": measure_paints(app, paints, change_text=False),
+            "uncached_ms": measure_paints(app, paints, change_text=True),
+        })
+
+        app.close()
+        qapp.processEvents()
+
+    return results
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark FlashlightWidget painting")
+    parser.add_argument("-n", "--paints", metavar="N", type=int, default=20,
+                        help="Number of paints per configuration (default: 20)")
+    args = parser.parse_args(argv[1:])
+
+    json.dump(run_benchmark(args.paints), sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
+
+
+# EOF #
@@ -0,0 +1,136 @@
+# qflashlight - Simple Qt-based fullscreen flashlight
+# Copyright (C) 2017 Ingo Ruhnke <grumbel@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Measure the time from process start to the first painted frame and
+the time a --reuse invocation takes to hand its options over
+
+    python3 -m benchmarks.bench_startup [-r RUNS] [-- QFLASHLIGHT-ARGS...]
+
+Everything runs on the offscreen QPA platform, so no display is needed.
+"""
+
+from typing import Any
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+# Runs qflashlight and prints the wall clock time after the first paint
+FIRST_FRAME_RUNNER = """
+import sys
+import time
+
+from PyQt5.QtWidgets import QApplication
+
+from qflashlight import flashlight_widget
+
+paint_event = flashlight_widget.FlashlightWidget.paintEvent
+
+
+def first_paint_event(self, ev):
+    paint_event(self, ev)
+    print(time.time(), flush=True)
+    QApplication.instance().quit()
+
+
+flashlight_widget.FlashlightWidget.paintEvent = first_paint_event
+
+from qflashlight.qflashlight import main
+
+main(["qflashlight"] + sys.argv[1:])
+"""
+
+
+def offscreen_env(**kwargs: str) -> dict[str, str]:
+    env = dict(os.environ, **kwargs)
+    env["QT_QPA_PLATFORM"] = "offscreen"
+    env["PYTHONPATH"] = os.pathsep.join([os.getcwd()] + env.get("PYTHONPATH", "").split(os.pathsep))
+    return env
+
+
+def summarize(name: str, samples: list[float]) -> dict[str, Any]:
+    return {
+        "name": name,
+        "runs": len(samples),
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+        "max_ms": max(samples),
+    }
+
+
+def time_to_first_frame(qflashlight_args: list[str]) -> float:
+    start = time.time()
+    output = subprocess.run([sys.executable, "-c", FIRST_FRAME_RUNNER] + qflashlight_args,
+                            env=offscreen_env(), check=True, timeout=30,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout
+    return (float(output.split()[0]) - start) * 1000
+
+
+def reuse_handoff(runs: int) -> list[float]:
+    samples = []
+    with tempfile.TemporaryDirectory() as runtime_dir:
+        env = offscreen_env(XDG_RUNTIME_DIR=runtime_dir)
+        server = subprocess.Popen([sys.executable, "-m", "qflashlight.qflashlight", "--control-socket"],
+                                  env=env, stderr=subprocess.DEVNULL)
+        try:
+            socket_path = os.path.join(runtime_dir, "qflashlight.sock")
+            while not os.path.exists(socket_path):
+                time.sleep(0.01)
+
+            for i in range(runs):
+                start = time.perf_counter()
+                subprocess.run([sys.executable, "-m", "qflashlight.qflashlight", "--reuse", "-t", str(i)],
+                               env=env, check=True, timeout=30)
+                samples.append((time.perf_counter() - start) * 1000)
+        finally:
+            server.terminate()
+            server.wait()
+    return samples
+
+
+def run_benchmark(runs: int, qflashlight_args: list[str]) -> list[dict[str, Any]]:
+    return [
+        summarize("time_to_first_frame",
+                  [time_to_first_frame(qflashlight_args) for _ in range(runs)]),
+        summarize("reuse_handoff", reuse_handoff(runs)),
+    ]
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark qflashlight startup")
+    parser.add_argument("-r", "--runs", metavar="N", type=int, default=10,
+                        help="Number of runs (default: 10)")
+    parser.add_argument("ARGS", nargs="*",
+                        help="Arguments passed to qflashlight (default: -t Hello)")
+    args = parser.parse_args(argv[1:])
+
+    results = run_benchmark(args.runs, args.ARGS or ["-t", "Hello"])
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
+
+
+# EOF #
@@ -0,0 +1,124 @@
+# qflashlight - Simple Qt-based fullscreen flashlight
+# Copyright (C) 2017 Ingo Ruhnke <grumbel@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Run all benchmarks and compare the results against a baseline
+
+    python3 -m benchmarks.run [-o RESULTS.json] [--baseline BASELINE.json]
+
+Results are written as JSON mapping 'suite/benchmark/metric' to a
+number. Metrics ending in '_per_sec' are better when higher, all
+others when lower. With --baseline the exit status is 1 when any metric
+got worse by more than --tolerance.
+"""
+
+from typing import Any, Callable, Optional
+
+import argparse
+import json
+import os
+import sys
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from benchmarks import bench_command, bench_model, bench_paint, bench_startup  # noqa: E402
+
+
+SUITES: dict[str, Callable[[argparse.Namespace], list[dict[str, Any]]]] = {
+    "command": lambda args: bench_command.run_benchmark("cat /proc/loadavg", args.duration),
+    "model": lambda args: bench_model.run_benchmark(2000),
+    "paint": lambda args: bench_paint.run_benchmark(20),
+    "startup": lambda args: bench_startup.run_benchmark(args.runs, ["-t", "Hello"]),
+}
+
+
+# result fields that describe the measurement rather than measure anything
+METADATA = {"name", "runs"}
+
+
+def flatten(suite: str, results: list[dict[str, Any]]) -> dict[str, float]:
+    metrics = {}
+    for result in results:
+        for key, value in result.items():
+            if key not in METADATA and isinstance(value, (int, float)):
+                metrics[f"{suite}/{result['name']}/{key}"] = float(value)
+    return metrics
+
+
+def compare(results: dict[str, float], baseline: dict[str, float],
+            tolerance: float) -> list[str]:
+    """Returns a description of every regression"""
+    regressions = []
+    for key, value in sorted(results.items()):
+        base = baseline.get(key)
+        if base is None or base == 0:
+            continue
+
+        if key.endswith("_per_sec"):
+            change = base / value - 1 if value else float("inf")
+        else:
+            change = value / base - 1
+
+        marker = ""
+        if change > tolerance:
+            marker = "  REGRESSION"
+            regressions.append(key)
+        print(f"{key}: {base:.3f} -> {value:.3f} ({change:+.1%}){marker}", file=sys.stderr)
+    return regressions
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(description="Run the qflashlight benchmarks")
+    parser.add_argument("-s", "--suite", metavar="SUITE", action="append", choices=list(SUITES),
+                        help=f"Run only SUITE, can be given multiple times ({', '.join(SUITES)})")
+    parser.add_argument("-o", "--output", metavar="FILE", type=str, default=None,
+                        help="Write the results to FILE instead of stdout")
+    parser.add_argument("-b", "--baseline", metavar="FILE", type=str, default=None,
+                        help="Compare the results against the results in FILE")
+    parser.add_argument("-t", "--tolerance", metavar="FRACTION", type=float, default=0.2,
+                        help="Allowed slowdown relative to the baseline (default: 0.2)")
+    parser.add_argument("-d", "--duration", metavar="SECONDS", type=float, default=2.0,
+                        help="Duration of the command benchmarks (default: 2.0)")
+    parser.add_argument("-r", "--runs", metavar="N", type=int, default=5,
+                        help="Number of runs of the startup benchmarks (default: 5)")
+    args = parser.parse_args(argv[1:])
+
+    results: dict[str, float] = {}
+    for suite in args.suite or SUITES:
+        results.update(flatten(suite, SUITES[suite](args)))
+
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write("\n")
+    else:
+        with open(args.output, "w") as fout:
+            json.dump(results, fout, indent=2, sort_keys=True)
+            fout.write("\n")
+
+    baseline: Optional[dict[str, float]] = None
+    if args.baseline is not None:
+        with open(args.baseline) as fin:
+            baseline = json.load(fin)
+
+    if baseline is not None and compare(results, baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
+
+
+# EOF #
@@ -15,17 +15,29 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
-from typing import Optional
+from typing import Optional, TextIO, TYPE_CHECKING
 
-from PyQt5.QtCore import Qt, QRect, QPoint
-from PyQt5.QtGui import QColor, QFont
-from PyQt5.QtWidgets import QMenu
+import sys
+import time
+
+from PyQt5.QtCore import Qt, QRect, QPoint, QSize, QTimer
+from PyQt5.QtGui import QColor, QFont, QGuiApplication, QScreen
 
-from qflashlight.color_dialog import show_color_dialog
 from qflashlight.flashlight_model import FlashlightModel
 from qflashlight.flashlight_widget import FlashlightWidget
-from qflashlight.text_generator import TextGenerator
-from qflashlight.text_dialog import show_text_dialog
+from qflashlight.pager import Pager
+from qflashlight.stats import PaintStats
+from qflashlight.stream_generator import StreamGenerator
+from qflashlight.text_generator import TextGenerator, OverlapPolicy
+from qflashlight.text_layout import TextLayoutCache
+from qflashlight.text_limits import TextLimits
+from qflashlight.text_source import TextSource
+
+if TYPE_CHECKING:
+    from qflashlight.control_server import ControlServer
+    from qflashlight.dashboard import Dashboard
+    from qflashlight.frame_exporter import FrameExporter
+    from qflashlight.metrics_server import MetricsServer
 
 
 class Application:
@@ -34,20 +46,158 @@ class Application:
         self._fullscreen: bool = False
         self._borderless: bool = False
         self._cursor_visible: bool = True
-        self._flashlight_widget = FlashlightWidget(self)
-        self._text_generator: Optional[TextGenerator] = None
+        self._max_fps: Optional[float] = None
+        self._preview_interval_msec: int = 1000 // 30
+        self._instrumented: bool = False
+        self._debug_overlay: bool = False
+        self._shown: bool = False
+        # whether any window can be seen, sources are suspended otherwise
+        self._visible: bool = True
+        self._text_source: Optional[TextSource] = None
+        self._dashboard: Optional['Dashboard'] = None
+        self._text_limits = TextLimits()
+        self._control_server: Optional['ControlServer'] = None
+        self._metrics_server: Optional['MetricsServer'] = None
+        self._frame_exporter: Optional['FrameExporter'] = None
+        self._stats_timer: Optional[QTimer] = None
+        self._stats_file: Optional[str] = None
 
         self._flashlight_model = FlashlightModel()
-        self._flashlight_model.sig_changed.connect(self._flashlight_widget.repaint)
+
+        # all widgets show the same model, so they share the text layout
+        # and the paint statistics
+        self._layout_cache = TextLayoutCache()
+        self._paint_stats = PaintStats()
+
+        # None for a single window, otherwise the names of the screens
+        # to cover with one window each, empty for all screens
+        self._screen_names: Optional[list[str]] = None
+        self._screens_connected: bool = False
+        self._widget_screens: list[Optional[QScreen]] = [None]
+        self._flashlight_widgets: list[FlashlightWidget] = [self._create_widget()]
+
+        # the window manager closing the last window quits without close(),
+        # running commands have to be stopped before Qt tears them down
+        qapp = QGuiApplication.instance()
+        assert qapp is not None
+        qapp.aboutToQuit.connect(self.close)
 
     def flashlight_model(self) -> FlashlightModel:
         return self._flashlight_model
 
+    def flashlight_widget(self) -> FlashlightWidget:
+        """The first widget, used as parent for dialogs"""
+        return self._flashlight_widgets[0]
+
+    def flashlight_widgets(self) -> list[FlashlightWidget]:
+        return list(self._flashlight_widgets)
+
+    def _create_widget(self) -> FlashlightWidget:
+        widget = FlashlightWidget(self, layout_cache=self._layout_cache, paint_stats=self._paint_stats)
+        widget.set_max_fps(self._max_fps)
+        widget.set_instrumented(self._instrumented)
+        if self._debug_overlay:
+            widget.set_debug_overlay(True)
+        if not self._cursor_visible:
+            widget.setCursor(Qt.BlankCursor)
+        self._flashlight_model.sig_changed.connect(widget.schedule_update)
+        if self._dashboard is not None:
+            self._dashboard.sig_changed.connect(widget.schedule_update)
+        widget.sig_exposed_changed.connect(self._update_visibility)
+        return widget
+
+    def _destroy_widget(self, widget: FlashlightWidget) -> None:
+        widget.sig_exposed_changed.disconnect(self._update_visibility)
+        self._flashlight_model.sig_changed.disconnect(widget.schedule_update)
+        if self._dashboard is not None:
+            self._dashboard.sig_changed.disconnect(widget.schedule_update)
+        widget.close()
+        widget.deleteLater()
+
+    def set_screens(self, names: Optional[list[str]]) -> None:
+        """Cover each screen with its own window, all screens when 'names'
+        is empty or the screens with the given names, None returns to a
+        single window. Screens that are plugged in later are covered too."""
+        if not self._screens_connected:
+            qapp = QGuiApplication.instance()
+            assert isinstance(qapp, QGuiApplication)
+            qapp.screenAdded.connect(lambda screen: self._update_screens())
+            qapp.screenRemoved.connect(self._update_screens)
+            self._screens_connected = True
+
+        if names:
+            available = [screen.name() for screen in QGuiApplication.screens()]
+            for name in names:
+                if name not in available:
+                    print(f"qflashlight: no screen named {name!r}, available screens: {', '.join(available)}",
+                          file=sys.stderr)
+
+        self._screen_names = names
+        self._update_screens()
+
+    def _update_screens(self, removed: Optional[QScreen] = None) -> None:
+        wanted: list[Optional[QScreen]]
+        if self._screen_names is None:
+            wanted = [None]
+        else:
+            wanted = [screen for screen in QGuiApplication.screens()
+                      if screen is not removed and self._covers_screen(screen)]
+            if not wanted:
+                # keep the current windows until a matching screen shows up
+                return
+
+        current = dict(zip(self._widget_screens, self._flashlight_widgets))
+        # reuse the windows of screens that are gone before creating new ones
+        spare = [widget for screen, widget in current.items() if screen not in wanted]
+        widgets = []
+        for screen in wanted:
+            widget = current.get(screen)
+            if widget is None:
+                widget = spare.pop(0) if spare else self._create_widget()
+                self._place_widget(widget, screen)
+            widgets.append(widget)
+
+        self._widget_screens = wanted
+        self._flashlight_widgets = widgets
+        for widget in spare:
+            self._destroy_widget(widget)
+        self._update_visibility()
+
+    def _covers_screen(self, screen: QScreen) -> bool:
+        return not self._screen_names or screen.name() in self._screen_names
+
+    def _place_widget(self, widget: FlashlightWidget, screen: Optional[QScreen]) -> None:
+        if screen is not None:
+            widget.set_fullscreen(False)
+            widget.create()
+            handle = widget.windowHandle()
+            if handle is not None:
+                handle.setScreen(screen)
+            widget.setGeometry(screen.geometry())
+
+        widget.set_fullscreen(self._fullscreen)
+        if self._borderless:
+            widget.set_borderless(True)
+        if self._shown:
+            widget.show()
+
     def show(self) -> None:
-        self._flashlight_widget.show()
+        self._shown = True
+        for widget in self._flashlight_widgets:
+            widget.show()
 
     def close(self) -> None:
-        self._flashlight_widget.close()
+        self._stop_text_source()
+        if self._control_server is not None:
+            self._control_server.close()
+        if self._metrics_server is not None:
+            self._metrics_server.close()
+        if self._frame_exporter is not None:
+            self._frame_exporter.stop()
+        if self._stats_timer is not None:
+            self._stats_timer.stop()
+        for widget in self._flashlight_widgets:
+            widget.close()
 
     def set_fullscreen(self, fullscreen: bool) -> None:
         self._fullscreen = fullscreen
@@ -72,19 +222,33 @@ class Application:
         self._apply_window_mode()
 
     def _apply_window_mode(self) -> None:
-        self._flashlight_widget.set_fullscreen(self._fullscreen)
-        self._flashlight_widget.set_borderless(self._borderless)
+        for widget in self._flashlight_widgets:
+            widget.set_fullscreen(self._fullscreen)
+            widget.set_borderless(self._borderless)
+
+    def set_max_fps(self, fps: Optional[float]) -> None:
+        self._max_fps = fps
+        for widget in self._flashlight_widgets:
+            widget.set_max_fps(fps)
+
+    def set_preview_fps(self, fps: Optional[float]) -> None:
+        """Limit the live preview of the text and color dialogs to 'fps'
+        updates per second, None or 0 for no limit"""
+        self._preview_interval_msec = 0 if not fps or fps <= 0 else int(1000 / fps)
 
     def set_window_geometry(self, geometry: QRect) -> None:
-        self._flashlight_widget.setGeometry(geometry)
+        """Move the single window, windows covering screens stay where they are"""
+        if self._screen_names is None:
+            self.flashlight_widget().setGeometry(geometry)
 
     def set_cursor_visible(self, visible: bool) -> None:
         self._cursor_visible = visible
 
-        if self._cursor_visible:
-            self._flashlight_widget.unsetCursor()
-        else:
-            self._flashlight_widget.setCursor(Qt.BlankCursor)
+        for widget in self._flashlight_widgets:
+            if self._cursor_visible:
+                widget.unsetCursor()
+            else:
+                widget.setCursor(Qt.BlankCursor)
 
     def cursor_visible(self) -> bool:
         return self._cursor_visible
@@ -101,35 +265,253 @@ class Application:
     def set_font(self, font: QFont) -> None:
         self._flashlight_model.set_font(font)
 
+    def set_text_limits(self, text_limits: TextLimits) -> None:
+        """Limits for text from commands and files started from now on
+        and for text passed to set_text()"""
+        self._text_limits = text_limits
+
+    def text_limits(self) -> TextLimits:
+        return self._text_limits
+
     def set_text(self, text: str) -> None:
-        self._text_generator = None
-        self._flashlight_model.set_text(text)
+        self._stop_text_source()
+        self._flashlight_model.set_text(self._text_limits.apply(text))
 
     def show_color_dialog(self) -> None:
-        show_color_dialog(self._flashlight_widget,
+        from qflashlight.color_dialog import show_color_dialog
+
+        show_color_dialog(self.flashlight_widget(),
                           self._flashlight_model.background_color,
-                          self._flashlight_model.set_background_color)
+                          self._flashlight_model.set_background_color,
+                          self._preview_interval_msec)
 
     def show_text_color_dialog(self) -> None:
-        show_color_dialog(self._flashlight_widget,
+        from qflashlight.color_dialog import show_color_dialog
+
+        show_color_dialog(self.flashlight_widget(),
                           self._flashlight_model.foreground_color,
-                          self._flashlight_model.set_foreground_color)
+                          self._flashlight_model.set_foreground_color,
+                          self._preview_interval_msec)
 
     def show_text_dialog(self) -> None:
-        show_text_dialog(self._flashlight_widget,
-                         self._flashlight_model.text(),
-                         self.set_text)
+        from qflashlight.text_dialog import show_text_dialog
 
-    def set_command(self, command: str, refresh_interval_sec: float) -> None:
-        def update_text(text: str) -> None:
-            self._flashlight_model.set_text(text)
-            self._flashlight_widget.repaint()
+        show_text_dialog(self.flashlight_widget(),
+                         self._flashlight_model.text(),
+                         self.set_text,
+                         self._preview_interval_msec)
+
+    def set_command(self, command: str, refresh_interval_sec: Optional[float],
+                    timeout_sec: Optional[float] = None,
+                    overlap_policy: OverlapPolicy = OverlapPolicy.SKIP,
+                    persistent_shell: bool = False,
+                    align: bool = False) -> None:
+        self.set_source(TextGenerator(command, refresh_interval_sec,
+                                      self._flashlight_model.set_text,
+                                      timeout_sec=timeout_sec,
+                                      overlap_policy=overlap_policy,
+                                      persistent_shell=persistent_shell,
+                                      align=align,
+                                      text_limits=self._text_limits))
+
+    def set_stream(self, command: str, lines: int = 1,
+                   delimiter: Optional[str] = None,
+                   max_buffer: int = 1024 * 1024) -> None:
+        self.set_source(StreamGenerator(command, self._flashlight_model.set_text,
+                                        lines=lines,
+                                        delimiter=delimiter,
+                                        max_buffer=max_buffer,
+                                        text_limits=self._text_limits))
+
+    def set_pager(self, filename: str, lines_per_page: int = 25,
+                  auto_scroll_sec: Optional[float] = None) -> None:
+        self.set_source(Pager(self._flashlight_model.set_text, filename,
+                              lines_per_page=lines_per_page,
+                              auto_scroll_sec=auto_scroll_sec,
+                              text_limits=self._text_limits))
+
+    def scroll(self, lines: int) -> None:
+        if isinstance(self._text_source, Pager):
+            self._text_source.scroll(lines)
+
+    def scroll_pages(self, pages: int) -> None:
+        if isinstance(self._text_source, Pager):
+            self._text_source.scroll_pages(pages)
+
+    def scroll_to_start(self) -> None:
+        if isinstance(self._text_source, Pager):
+            self._text_source.scroll_to_start()
+
+    def scroll_to_end(self) -> None:
+        if isinstance(self._text_source, Pager):
+            self._text_source.scroll_to_end()
+
+    def set_source(self, source: TextSource) -> None:
+        """Replace the current text source, 'source' should deliver its
+        text to FlashlightModel.set_text()"""
+        self._stop_text_source()
+        self._text_source = source
+        self._text_source.start()
+        if not self._visible:
+            self._text_source.set_suspended(True)
+
+    def text_source(self) -> Optional[TextSource]:
+        return self._text_source
+
+    def set_dashboard(self, dashboard: 'Dashboard') -> None:
+        """Split the window into the panels of 'dashboard', replacing the
+        text and its source"""
+        self._stop_text_source()
+        self._flashlight_model.set_text("")
+
+        self._dashboard = dashboard
+        for widget in self._flashlight_widgets:
+            dashboard.sig_changed.connect(widget.schedule_update)
+            widget.schedule_update()
+        dashboard.start()
+        if not self._visible:
+            dashboard.set_suspended(True)
+
+    def dashboard(self) -> Optional['Dashboard']:
+        return self._dashboard
+
+    def is_visible(self) -> bool:
+        """Whether any window can be seen, windows that were never shown
+        don't count, so rendering without a window keeps going"""
+        return self._visible
+
+    def _update_visibility(self) -> None:
+        visible = not self._shown or any(widget.is_exposed() for widget in self._flashlight_widgets)
+        if visible == self._visible:
+            return
+
+        self._visible = visible
+        if self._text_source is not None:
+            self._text_source.set_suspended(not visible)
+        if self._dashboard is not None:
+            self._dashboard.set_suspended(not visible)
+
+    def source_counters(self) -> dict[str, int]:
+        """The counters of the text source, summed over all panels of a dashboard"""
+        if self._text_source is not None:
+            return self._text_source.counters()
+        elif self._dashboard is not None:
+            return self._dashboard.counters()
+        else:
+            return {}
 
-        self._text_generator = TextGenerator(command, refresh_interval_sec,
-                                             update_text)
-        self._text_generator.start()
+    def source_counter_group(self) -> str:
+        """The kind of source the source_counters() come from"""
+        if self._text_source is not None:
+            return self._text_source.counter_group()
+        else:
+            # all panels of a dashboard run commands
+            return "command"
+
+    def _stop_text_source(self) -> None:
+        if self._text_source is not None:
+            self._text_source.stop()
+            self._text_source = None
+
+        if self._dashboard is not None:
+            self._dashboard.stop()
+            self._dashboard = None
+            for widget in self._flashlight_widgets:
+                widget.schedule_update()
+
+    def listen(self, socket_path: str) -> bool:
+        """Accept control commands on the local socket 'socket_path'"""
+        from qflashlight.control_server import ControlServer
+
+        if self._control_server is None:
+            self._control_server = ControlServer(self)
+        return self._control_server.listen(socket_path)
+
+    def listen_metrics(self, address: str, port: int) -> bool:
+        """Serve statistics in the Prometheus text format on http://address:port/metrics"""
+        from qflashlight.metrics_server import MetricsServer
+
+        self.set_instrumented(True)
+        if self._metrics_server is None:
+            self._metrics_server = MetricsServer(self)
+        return self._metrics_server.listen(address, port)
+
+    def export_frames(self, filename: str, size: QSize, fps: float,
+                      frames: Optional[int] = None) -> 'FrameExporter':
+        """Render the content at 'size' without a window, 'fps' times a
+        second, into the PNG file 'filename' or as raw RGB24 to stdout
+        with '-', see FrameExporter"""
+        from qflashlight.frame_exporter import FrameExporter
+        from qflashlight.renderer import Renderer
+
+        renderer = Renderer(self._layout_cache, self._paint_stats)
+        renderer.set_instrumented(True)
+        self._frame_exporter = FrameExporter(self, renderer, self._paint_stats,
+                                             filename, size, fps, frames)
+        self._frame_exporter.start()
+        return self._frame_exporter
+
+    def set_instrumented(self, instrumented: bool) -> None:
+        self._instrumented = instrumented
+        for widget in self._flashlight_widgets:
+            widget.set_instrumented(instrumented)
+
+    def toggle_debug_overlay(self) -> None:
+        """Show the debug_report() on top of the text"""
+        self._debug_overlay = not self._debug_overlay
+        if self._debug_overlay:
+            self.set_instrumented(True)
+        for widget in self._flashlight_widgets:
+            widget.set_debug_overlay(self._debug_overlay)
+
+    def set_stats_dump(self, filename: str, interval_sec: float) -> None:
+        """Append the debug_report() to 'filename' every 'interval_sec'
+        seconds, '-' writes to stderr"""
+        self.set_instrumented(True)
+        self._stats_file = filename
+        if self._stats_timer is None:
+            self._stats_timer = QTimer()
+            self._stats_timer.timeout.connect(self._dump_stats)
+        self._stats_timer.start(int(interval_sec * 1000))
+
+    def _dump_stats(self) -> None:
+        if self._stats_file is None:
+            return
+
+        if self._stats_file == "-":
+            self._write_stats(sys.stderr)
+        else:
+            try:
+                with open(self._stats_file, "a", encoding="utf-8") as fout:
+                    self._write_stats(fout)
+            except OSError as err:
+                print(f"qflashlight: error: couldn't write stats: {err}", file=sys.stderr)
+
+    def _write_stats(self, fout: TextIO) -> None:
+        print(f"# {time.strftime('%Y-%m-%d %H:%M:%S')}", file=fout)
+        self.print_stats(fout)
+        fout.flush()
+
+    def debug_report(self) -> list[str]:
+        lines = [f"{name}: {stats}" for name, stats in self._paint_stats.stats().items()]
+        lines.append(f"paints_per_sec: {self._paint_stats.paints_per_sec()}")
+        if self._text_source is not None:
+            lines += [f"{name}: {stats}" for name, stats in self._text_source.stats().items()]
+        if self._dashboard is not None:
+            pool = self._dashboard.pool()
+            lines.append(f"dashboard_jobs: running={pool.running()} waiting={pool.waiting()}")
+        lines += [f"{name}: {count}" for name, count in sorted(self.source_counters().items())]
+        lines.append(f"suppressed_updates: {self._flashlight_model.suppressed_updates()}")
+        lines.append(f"visible: {'yes' if self._visible else 'no'}")
+        return lines
+
+    def print_stats(self, fout: TextIO) -> None:
+        for line in self.debug_report():
+            print(line, file=fout)
 
     def show_context_menu(self, pos: QPoint) -> None:
+        from PyQt5.QtWidgets import QMenu
+
         menu = QMenu()
 
         if self._fullscreen:
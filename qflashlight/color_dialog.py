@@ -21,18 +21,23 @@ from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QColor
 from PyQt5.QtWidgets import QWidget, QColorDialog
 
+from qflashlight.throttle import Throttle
+
 
 def show_color_dialog(parent: QWidget,
                       getter: Callable[[], QColor],
-                      setter: Callable[[QColor], None]) -> None:
+                      setter: Callable[[QColor], None],
+                      preview_interval_msec: int = 0) -> None:
     tmpcolor: Optional[QColor] = getter()
 
     def set_color(color: QColor) -> None:
         nonlocal tmpcolor
+        preview.cancel()
         setter(color)
         tmpcolor = None
 
     def restore_color() -> None:
+        preview.cancel()
         if tmpcolor is not None:
             setter(tmpcolor)
 
@@ -40,7 +45,10 @@ def show_color_dialog(parent: QWidget,
     color_dlg.setWindowModality(Qt.WindowModal)
     color_dlg.setCurrentColor(getter())
 
-    color_dlg.currentColorChanged.connect(setter)
+    # dragging across the color wheel repaints at most once per interval
+    preview = Throttle(lambda: setter(color_dlg.currentColor()), preview_interval_msec, color_dlg)
+
+    color_dlg.currentColorChanged.connect(preview.trigger)
     color_dlg.colorSelected.connect(set_color)
     color_dlg.rejected.connect(restore_color)
 
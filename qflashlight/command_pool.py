@@ -0,0 +1,70 @@
+# qflashlight - Simple Qt-based fullscreen flashlight
+# Copyright (C) 2017 Ingo Ruhnke <grumbel@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from typing import Callable, Optional
+
+from collections import OrderedDict
+
+from PyQt5.QtCore import QObject
+
+
+class CommandPool(QObject):
+    """Limits how many commands run at the same time
+
+    A TextGenerator requests a slot before starting its command and
+    releases it when the command finished or was killed. Requests
+    beyond the limit wait in arrival order, each owner has at most one
+    request waiting."""
+
+    def __init__(self, max_jobs: int, parent: Optional[QObject] = None) -> None:
+        super().__init__(parent)
+
+        self._max_jobs = max(1, max_jobs)
+        self._running: int = 0
+        self._waiting: OrderedDict[object, Callable[[], None]] = OrderedDict()
+
+    def max_jobs(self) -> int:
+        return self._max_jobs
+
+    def running(self) -> int:
+        return self._running
+
+    def waiting(self) -> int:
+        return len(self._waiting)
+
+    def request(self, owner: object, callback: Callable[[], None]) -> None:
+        """Call 'callback' as soon as a slot is free, the callback then
+        holds the slot until release() is called"""
+        if self._running < self._max_jobs and not self._waiting:
+            self._running += 1
+            callback()
+        else:
+            self._waiting[owner] = callback
+
+    def cancel(self, owner: object) -> None:
+        """Drop the waiting request of 'owner'"""
+        self._waiting.pop(owner, None)
+
+    def release(self) -> None:
+        self._running -= 1
+        while self._waiting and self._running < self._max_jobs:
+            _, callback = self._waiting.popitem(last=False)
+            self._running += 1
+            callback()
+
+
+# EOF #
@@ -0,0 +1,118 @@
+# qflashlight - Simple Qt-based fullscreen flashlight
+# Copyright (C) 2017 Ingo Ruhnke <grumbel@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Send commands to a running qflashlight started with --control-socket"""
+
+from typing import Any
+
+import argparse
+import json
+import os
+import shlex
+import socket
+import sys
+
+from qflashlight.control_protocol import (COMMANDS, default_socket_path,
+                                          encode_command, parse_words,
+                                          socket_path, validate_command)
+
+
+def parse_line(line: str) -> list[Any]:
+    """Commands on stdin are either JSON arrays or shell-quoted words"""
+    if line.lstrip().startswith("["):
+        return validate_command(json.loads(line))
+    else:
+        return parse_words(shlex.split(line))
+
+
+def send_commands(socket_path: str, commands: list[list[Any]]) -> bool:
+    """Send 'commands' to the instance listening on 'socket_path',
+    returns False when there is no such instance or it can't be reached"""
+    data = b"".join(encode_command(command) for command in commands)
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socket_path)
+            sock.sendall(data)
+    except (FileNotFoundError, ConnectionRefusedError):
+        return False
+    except OSError as err:
+        print(f"qflashlight: error: couldn't send commands to {socket_path}: {err.strerror or err}",
+              file=sys.stderr)
+        return False
+    else:
+        return True
+
+
+def parse_args(args: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Control a running qflashlight",
+        epilog="commands: " + ", ".join(COMMANDS))
+    parser.add_argument("COMMAND", nargs="*",
+                        help="Command and its arguments, e.g. 'set_text hello'")
+    parser.add_argument("-s", "--socket", metavar="PATH", type=socket_path, default=default_socket_path(),
+                        help=f"Path of the control socket (default: {default_socket_path()})")
+    parser.add_argument("-e", "--execute", metavar="COMMAND", action="append", default=[],
+                        help="Send the shell-quoted COMMAND, can be given multiple times")
+    parser.add_argument("-i", "--stdin", action="store_true", default=False,
+                        help="Read commands from stdin, one per line, and send them as they arrive")
+    return parser.parse_args(args)
+
+
+def main(argv: list[str]) -> None:
+    args = parse_args(argv[1:])
+    prog = os.path.basename(argv[0])
+
+    try:
+        commands = [parse_words(shlex.split(text)) for text in args.execute]
+        if args.COMMAND:
+            commands.append(parse_words(args.COMMAND))
+    except ValueError as err:
+        sys.exit(f"{prog}: error: {err}")
+
+    if not commands and not args.stdin:
+        sys.exit(f"{prog}: error: no command given")
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(args.socket)
+            sock.sendall(b"".join(encode_command(command) for command in commands))
+
+            if args.stdin:
+                for line in sys.stdin:
+                    if not line.strip():
+                        continue
+
+                    try:
+                        command = parse_line(line)
+                    except ValueError as err:
+                        print(f"{prog}: error: {err}", file=sys.stderr)
+                        continue
+
+                    sock.sendall(encode_command(command))
+    except OSError as err:
+        sys.exit(f"{prog}: error: {args.socket}: {err}")
+
+
+def main_entrypoint() -> None:
+    main(sys.argv)
+
+
+if __name__ == '__main__':
+    main_entrypoint()
+
+
+# EOF #
@@ -0,0 +1,100 @@
+# qflashlight - Simple Qt-based fullscreen flashlight
+# Copyright (C) 2017 Ingo Ruhnke <grumbel@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Wire format of the control socket
+
+Every command is a JSON array holding the command name followed by
+its arguments, commands are separated by newlines. This module must
+not import Qt so that the control client starts quickly."""
+
+from typing import Any
+
+import json
+import os
+
+
+# command name -> (minimum, maximum) number of arguments
+COMMANDS: dict[str, tuple[int, int]] = {
+    "set_text": (1, 1),
+    "set_background_color": (1, 1),
+    "set_foreground_color": (1, 1),
+    "set_font": (1, 1),
+    "set_fullscreen": (1, 1),
+    "set_command": (1, 2),
+    "apply_args": (1, 1),
+}
+
+
+def default_socket_path() -> str:
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "qflashlight.sock")
+    else:
+        return f"/tmp/qflashlight-{os.getuid()}.sock"
+
+
+def socket_path(text: str) -> str:
+    """The socket path relative to the current directory, QLocalServer
+    would look up a bare name in the temp directory instead"""
+    return os.path.abspath(text)
+
+
+def validate_command(command: Any) -> list[Any]:
+    if not isinstance(command, list) or not command or not isinstance(command[0], str):
+        raise ValueError(f"malformed command: {command!r}")
+
+    name, args = command[0], command[1:]
+    if name not in COMMANDS:
+        raise ValueError(f"unknown command: {name}")
+
+    min_args, max_args = COMMANDS[name]
+    if not min_args <= len(args) <= max_args:
+        raise ValueError(f"{name}: expected {min_args} to {max_args} arguments, got {len(args)}")
+
+    return command
+
+
+def encode_command(command: list[Any]) -> bytes:
+    return json.dumps(validate_command(command)).encode() + b"\n"
+
+
+def decode_command(line: bytes) -> list[Any]:
+    return validate_command(json.loads(line))
+
+
+def parse_words(words: list[str]) -> list[Any]:
+    """Convert a command given as command line words, e.g. from
+    'set_fullscreen yes', into its JSON form"""
+    if not words:
+        raise ValueError("empty command")
+
+    name, args = words[0], words[1:]
+    converted: list[Any] = list(args)
+    if name == "set_fullscreen" and len(args) == 1:
+        if args[0].lower() in ("1", "true", "yes", "on"):
+            converted = [True]
+        elif args[0].lower() in ("0", "false", "no", "off"):
+            converted = [False]
+        else:
+            raise ValueError(f"set_fullscreen: not a boolean: {args[0]}")
+    elif name == "set_command" and len(args) == 2:
+        converted = [args[0], float(args[1])]
+
+    return validate_command([name] + converted)
+
+
+# EOF #
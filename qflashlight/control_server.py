@@ -0,0 +1,222 @@
+# qflashlight - Simple Qt-based fullscreen flashlight
+# Copyright (C) 2017 Ingo Ruhnke <grumbel@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from typing import Any, Callable, TYPE_CHECKING
+
+import sys
+
+from PyQt5.QtCore import QObject, QTimer
+from PyQt5.QtGui import QColor, QFont
+from PyQt5.QtNetwork import QLocalServer, QLocalSocket
+
+from qflashlight.control_protocol import decode_command
+
+if TYPE_CHECKING:
+    from qflashlight.application import Application
+
+
+# commands that overwrite each other when they arrive in the same batch
+COALESCE_GROUPS = {
+    "set_text": "content",
+    "set_command": "content",
+}
+
+# commands that only change part of the state and can't be coalesced
+NO_COALESCE = {"apply_args"}
+
+# upper limit for a single command line
+MAX_LINE_LENGTH = 16 * 1024 * 1024
+
+# how long to wait for an instance that already listens on the socket
+PROBE_TIMEOUT_MSEC = 500
+
+
+def color_from_json(value: Any) -> QColor:
+    if not isinstance(value, str) or not QColor.isValidColor(value):
+        raise ValueError(f"invalid color name: {value!r}")
+    return QColor(value)
+
+
+def font_from_json(value: Any) -> QFont:
+    if not isinstance(value, str):
+        raise ValueError(f"invalid font: {value!r}")
+    return QFont(value)
+
+
+def bool_from_json(value: Any) -> bool:
+    if not isinstance(value, bool):
+        raise ValueError(f"not a boolean: {value!r}")
+    return value
+
+
+def float_from_json(value: Any) -> float:
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        raise ValueError(f"not a number: {value!r}")
+    return float(value)
+
+
+def interval_from_json(value: Any) -> float:
+    interval = float_from_json(value)
+    if not interval > 0:
+        raise ValueError(f"not a positive interval: {value!r}")
+    return interval
+
+
+def str_from_json(value: Any) -> str:
+    if not isinstance(value, str):
+        raise ValueError(f"not a string: {value!r}")
+    return value
+
+
+class ControlServer(QObject):
+    """Applies commands received on a local socket to an Application
+
+    Commands are read as they arrive and queued, the queue is applied
+    once per event loop iteration with only the last command of each
+    kind taking effect, so a flood of updates costs one repaint."""
+
+    def __init__(self, app: 'Application') -> None:
+        super().__init__()
+
+        self._app = app
+        self._server = QLocalServer(self)
+        self._server.newConnection.connect(self._on_new_connection)
+        self._buffers: dict[QLocalSocket, bytearray] = {}
+
+        self._queue: dict[str, list[Any]] = {}
+        self._serial = 0
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.timeout.connect(self._flush)
+
+        self._handlers: dict[str, Callable[..., None]] = {
+            "set_text": lambda text: app.set_text(str_from_json(text)),
+            "set_background_color": lambda color: app.set_background_color(color_from_json(color)),
+            "set_foreground_color": lambda color: app.set_foreground_color(color_from_json(color)),
+            "set_font": lambda font: app.set_font(font_from_json(font)),
+            "set_fullscreen": lambda fullscreen: app.set_fullscreen(bool_from_json(fullscreen)),
+            "set_command": lambda command, interval=None: app.set_command(
+                str_from_json(command), None if interval is None else interval_from_json(interval)),
+            "apply_args": self._apply_args,
+        }
+
+    def _apply_args(self, values: Any) -> None:
+        from qflashlight.qflashlight import apply_args, args_from_json
+
+        if not isinstance(values, dict):
+            raise ValueError(f"not an object: {values!r}")
+
+        args, explicit = args_from_json(values)
+        apply_args(self._app, args, explicit)
+
+    def listen(self, path: str) -> bool:
+        """Listen on 'path', unless another instance is already listening
+        there, a stale socket file left behind by a crash is replaced"""
+        probe = QLocalSocket()
+        probe.connectToServer(path)
+        if probe.waitForConnected(PROBE_TIMEOUT_MSEC):
+            probe.disconnectFromServer()
+            print(f"qflashlight: couldn't listen on {path}: another instance is already listening",
+                  file=sys.stderr)
+            return False
+
+        if probe.error() in (QLocalSocket.LocalSocketError.ServerNotFoundError,  # type: ignore[operator]
+                             QLocalSocket.LocalSocketError.ConnectionRefusedError):
+            QLocalServer.removeServer(path)
+
+        # only the user running this instance may control it
+        self._server.setSocketOptions(QLocalServer.SocketOption.UserAccessOption)
+        if not self._server.listen(path):
+            print(f"qflashlight: couldn't listen on {path}: {self._server.errorString()}",
+                  file=sys.stderr)
+            return False
+        return True
+
+    def close(self) -> None:
+        self._server.close()
+
+    def _on_new_connection(self) -> None:
+        while self._server.hasPendingConnections():
+            socket = self._server.nextPendingConnection()
+            if socket is None:
+                break
+
+            self._buffers[socket] = bytearray()
+            socket.readyRead.connect(lambda socket=socket: self._on_ready_read(socket))
+            socket.disconnected.connect(lambda socket=socket: self._on_disconnected(socket))
+
+    def _on_disconnected(self, socket: QLocalSocket) -> None:
+        self._on_ready_read(socket)
+        # a command without a trailing newline is still a command
+        buf = self._buffers.pop(socket, None)
+        if buf:
+            self._enqueue_line(bytes(buf))
+        socket.deleteLater()
+
+    def _on_ready_read(self, socket: QLocalSocket) -> None:
+        buf = self._buffers.get(socket)
+        if buf is None:
+            return
+
+        buf += bytes(socket.readAll())
+        *lines, rest = buf.split(b"\n")
+        for line in lines:
+            self._enqueue_line(bytes(line))
+
+        if len(rest) > MAX_LINE_LENGTH:
+            print("qflashlight: control command too long, dropping connection", file=sys.stderr)
+            self._buffers.pop(socket)
+            socket.abort()
+            return
+
+        self._buffers[socket] = rest
+
+    def _enqueue_line(self, line: bytes) -> None:
+        if not line.strip():
+            return
+
+        try:
+            command = decode_command(line)
+        except ValueError as err:
+            print(f"qflashlight: control: {err}", file=sys.stderr)
+            return
+
+        if command[0] in NO_COALESCE:
+            self._serial += 1
+            key = f"{command[0]}#{self._serial}"
+        else:
+            key = COALESCE_GROUPS.get(command[0], command[0])
+        # re-insert so the queue stays in arrival order of the latest commands
+        self._queue.pop(key, None)
+        self._queue[key] = command
+
+        if not self._flush_timer.isActive():
+            self._flush_timer.start(0)
+
+    def _flush(self) -> None:
+        queue, self._queue = self._queue, {}
+        for name, *args in queue.values():
+            try:
+                self._handlers[name](*args)
+            except (TypeError, ValueError) as err:
+                print(f"qflashlight: control: {name}: {err}", file=sys.stderr)
+            except Exception as err:  # pylint: disable=broad-except
+                # an exception escaping a slot would abort the whole instance
+                print(f"qflashlight: control: {name}: {type(err).__name__}: {err}", file=sys.stderr)
+
+
+# EOF #
@@ -0,0 +1,234 @@
+# qflashlight - Simple Qt-based fullscreen flashlight
+# Copyright (C) 2017 Ingo Ruhnke <grumbel@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from typing import Any, Optional
+
+import json
+import math
+
+from PyQt5.QtCore import QObject, QRectF, pyqtSignal
+from PyQt5.QtGui import QColor, QFont
+
+from qflashlight.command_pool import CommandPool
+from qflashlight.flashlight_model import FlashlightModel
+from qflashlight.text_generator import TextGenerator
+from qflashlight.text_layout import TextLayoutCache
+from qflashlight.text_limits import TextLimits
+from qflashlight.text_source import TextSource
+
+
+# space between the panels, filled with the background color of the window
+PANEL_SPACING = 2
+
+DASHBOARD_KEYS = {"columns", "jobs", "interval", "panels"}
+PANEL_KEYS = {"text", "command", "interval", "timeout", "color", "text_color", "font"}
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate_dashboard(config: Any) -> dict[str, Any]:
+    """Check the structure of a dashboard configuration, which looks like:
+
+    {"columns": 2, "jobs": 4, "interval": 5,
+     "panels": [{"command": "uptime", "color": "navy"}, {"text": "Build"}]}
+
+    'columns', 'jobs' and 'interval' are optional, 'interval' is the
+    default for the panels."""
+    if not isinstance(config, dict):
+        raise ValueError("dashboard: not an object")
+
+    unknown = set(config) - DASHBOARD_KEYS
+    if unknown:
+        raise ValueError(f"dashboard: unknown keys: {', '.join(sorted(unknown))}")
+
+    for key in ("columns", "jobs"):
+        value = config.get(key)
+        if value is not None and (not isinstance(value, int) or value < 1):
+            raise ValueError(f"dashboard: {key} must be a positive integer: {value!r}")
+
+    interval = config.get("interval")
+    if interval is not None and not (_is_number(interval) and interval > 0):
+        raise ValueError(f"dashboard: interval must be a positive number: {interval!r}")
+
+    panels = config.get("panels")
+    if not isinstance(panels, list) or not panels:
+        raise ValueError("dashboard: panels must be a non-empty list")
+
+    for i, panel in enumerate(panels):
+        if not isinstance(panel, dict):
+            raise ValueError(f"dashboard: panel {i}: not an object")
+
+        unknown = set(panel) - PANEL_KEYS
+        if unknown:
+            raise ValueError(f"dashboard: panel {i}: unknown keys: {', '.join(sorted(unknown))}")
+
+        for key in ("text", "command", "font"):
+            if key in panel and not isinstance(panel[key], str):
+                raise ValueError(f"dashboard: panel {i}: {key} must be a string")
+
+        for key in ("color", "text_color"):
+            if key in panel and (not isinstance(panel[key], str) or not QColor.isValidColor(panel[key])):
+                raise ValueError(f"dashboard: panel {i}: invalid color: {panel[key]!r}")
+
+        interval = panel.get("interval")
+        if interval is not None and not (_is_number(interval) and interval > 0):
+            raise ValueError(f"dashboard: panel {i}: interval must be a positive number")
+
+        timeout = panel.get("timeout")
+        if timeout is not None and not (_is_number(timeout) and timeout > 0):
+            raise ValueError(f"dashboard: panel {i}: timeout must be a positive number")
+
+    return config
+
+
+def load_dashboard(filename: str) -> dict[str, Any]:
+    try:
+        with open(filename, encoding="utf-8") as fin:
+            config = json.load(fin)
+    except OSError as err:
+        raise ValueError(f"couldn't read {filename}: {err.strerror}") from err
+    except json.JSONDecodeError as err:
+        raise ValueError(f"{filename}: {err}") from err
+
+    return validate_dashboard(config)
+
+
+class Panel:
+    """A cell of the Dashboard with its own model and text source"""
+
+    def __init__(self) -> None:
+        self._model = FlashlightModel()
+        self._layout_cache = TextLayoutCache()
+        self._source: Optional[TextSource] = None
+
+    def model(self) -> FlashlightModel:
+        return self._model
+
+    def layout_cache(self) -> TextLayoutCache:
+        return self._layout_cache
+
+    def source(self) -> Optional[TextSource]:
+        return self._source
+
+    def set_source(self, source: Optional[TextSource]) -> None:
+        self.stop()
+        self._source = source
+
+    def start(self) -> None:
+        if self._source is not None:
+            self._source.start()
+
+    def set_suspended(self, suspended: bool) -> None:
+        if self._source is not None:
+            self._source.set_suspended(suspended)
+
+    def stop(self) -> None:
+        if self._source is not None:
+            self._source.stop()
+
+
+class Dashboard(QObject):
+    """Panels arranged in a grid, each showing its own text or command
+
+    The commands of all panels share a CommandPool, which limits how
+    many of them run at once, and their refresh ticks are spread over
+    the interval, so that the panels don't all fork at the same time."""
+
+    sig_changed = pyqtSignal()
+
+    def __init__(self, config: dict[str, Any], default_interval: Optional[float] = None,
+                 default_timeout: Optional[float] = None,
+                 text_limits: Optional[TextLimits] = None) -> None:
+        super().__init__()
+
+        self._text_limits = text_limits
+
+        self._panels: list[Panel] = []
+        self._pool = CommandPool(config.get("jobs") or 4, self)
+
+        panel_configs = config["panels"]
+        self._columns: int = config.get("columns") or math.ceil(math.sqrt(len(panel_configs)))
+        self._rows: int = math.ceil(len(panel_configs) / self._columns)
+
+        interval = config.get("interval", default_interval)
+        for i, panel_config in enumerate(panel_configs):
+            panel = Panel()
+            self._configure_panel(panel, panel_config,
+                                  panel_config.get("interval", interval),
+                                  panel_config.get("timeout", default_timeout),
+                                  i / len(panel_configs))
+            panel.model().sig_changed.connect(self.sig_changed)
+            self._panels.append(panel)
+
+    def _configure_panel(self, panel: Panel, config: dict[str, Any],
+                         interval: Optional[float], timeout: Optional[float], phase: float) -> None:
+        model = panel.model()
+        if "color" in config:
+            model.set_background_color(QColor(config["color"]))
+        if "text_color" in config:
+            model.set_foreground_color(QColor(config["text_color"]))
+        if "font" in config:
+            model.set_font(QFont(config["font"]))
+        model.set_text(config.get("text", ""))
+
+        if "command" in config:
+            panel.set_source(TextGenerator(config["command"], interval, model.set_text,
+                                           timeout_sec=timeout,
+                                           pool=self._pool,
+                                           phase_sec=phase * interval if interval else 0.0,
+                                           text_limits=self._text_limits))
+
+    def panels(self) -> list[Panel]:
+        return self._panels
+
+    def pool(self) -> CommandPool:
+        return self._pool
+
+    def panel_rects(self, rect: QRectF) -> list[QRectF]:
+        """The rectangles of the panels when the dashboard fills 'rect'"""
+        width = (rect.width() - (self._columns - 1) * PANEL_SPACING) / self._columns
+        height = (rect.height() - (self._rows - 1) * PANEL_SPACING) / self._rows
+        return [QRectF(rect.left() + (i % self._columns) * (width + PANEL_SPACING),
+                       rect.top() + (i // self._columns) * (height + PANEL_SPACING),
+                       width, height)
+                for i in range(len(self._panels))]
+
+    def counters(self) -> dict[str, int]:
+        """The counters of all panels added up"""
+        result: dict[str, int] = {}
+        for panel in self._panels:
+            source = panel.source()
+            if source is not None:
+                for name, count in source.counters().items():
+                    result[name] = result.get(name, 0) + count
+        return result
+
+    def start(self) -> None:
+        for panel in self._panels:
+            panel.start()
+
+    def stop(self) -> None:
+        for panel in self._panels:
+            panel.stop()
+
+    def set_suspended(self, suspended: bool) -> None:
+        for panel in self._panels:
+            panel.set_suspended(suspended)
+
+
+# EOF #
@@ -31,6 +31,9 @@ class FlashlightModel(QObject):
         self._font: QFont = QFont()
         self._text: str = ""
 
+        # number of setter calls that didn't change anything
+        self._suppressed_updates: int = 0
+
     def foreground_color(self) -> QColor:
         return self._fg_color
 
@@ -43,19 +46,38 @@ class FlashlightModel(QObject):
     def text(self) -> str:
         return self._text
 
+    def suppressed_updates(self) -> int:
+        return self._suppressed_updates
+
     def set_foreground_color(self, color: QColor) -> None:
+        if color == self._fg_color:
+            self._suppressed_updates += 1
+            return
+
         self._fg_color = color
         self.sig_changed.emit()
 
     def set_background_color(self, color: QColor) -> None:
+        if color == self._bg_color:
+            self._suppressed_updates += 1
+            return
+
         self._bg_color = color
         self.sig_changed.emit()
 
     def set_font(self, font: QFont) -> None:
+        if font == self._font:
+            self._suppressed_updates += 1
+            return
+
         self._font = font
         self.sig_changed.emit()
 
     def set_text(self, text: str) -> None:
+        if text == self._text:
+            self._suppressed_updates += 1
+            return
+
         self._text = text
         self.sig_changed.emit()
 
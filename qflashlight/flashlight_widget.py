@@ -17,29 +17,100 @@
 
 from typing import Optional, TYPE_CHECKING
 
-from PyQt5.QtCore import Qt, QPoint, QRectF
-from PyQt5.QtGui import (QPalette, QIcon, QContextMenuEvent, QPainter,
-                         QFontMetrics, QMouseEvent, QPaintEvent,
-                         QKeyEvent)
+import time
+
+from PyQt5.QtCore import Qt, QElapsedTimer, QEvent, QObject, QPoint, QRectF, QTimer, pyqtSignal
+from PyQt5.QtGui import (QIcon, QContextMenuEvent, QPainter, QColor, QFontDatabase,
+                         QHideEvent, QMouseEvent, QPaintEvent, QKeyEvent, QShowEvent)
 from PyQt5.QtWidgets import QWidget
 
+from qflashlight.stats import PaintStats, RunningStats
+from qflashlight.renderer import Renderer
+from qflashlight.text_layout import TextLayoutCache
+
 if TYPE_CHECKING:
     from qflashlight.application import Application
 
 
 class FlashlightWidget(QWidget):
 
-    def __init__(self, app: 'Application', parent: Optional[QWidget] = None) -> None:
+    # whether any of the window can be seen changed, see is_exposed()
+    sig_exposed_changed = pyqtSignal(bool)
+
+    def __init__(self, app: 'Application', parent: Optional[QWidget] = None,
+                 layout_cache: Optional[TextLayoutCache] = None,
+                 paint_stats: Optional[PaintStats] = None) -> None:
         super().__init__(parent)
 
         self._app = app
         self._mpos = QPoint()
 
+        # frame rate cap for schedule_update()
+        self._min_frame_interval_msec: Optional[int] = None
+        self._frame_clock = QElapsedTimer()
+        self._update_timer = QTimer(self)
+        self._update_timer.setSingleShot(True)
+        self._update_timer.timeout.connect(self.update)
+
+        # updates are held back while the window can't be seen
+        self._exposed = False
+        self._update_pending = False
+
+        # timings, only recorded when instrumented
+        self._instrumented = False
+        self._paint_stats = paint_stats if paint_stats is not None else PaintStats()
+        self._renderer = Renderer(layout_cache, self._paint_stats)
+
+        # debug overlay, refreshed once a second while visible
+        self._debug_overlay = False
+        self._debug_timer = QTimer(self)
+        self._debug_timer.setInterval(1000)
+        self._debug_timer.timeout.connect(self.update)
+
         self.setWindowTitle("QFlashlight")
-        self.setAutoFillBackground(True)
+        # paintEvent() fills the whole background itself
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
 
         self.setWindowIcon(QIcon.fromTheme("qflashlight"))
 
+    def showEvent(self, ev: Optional[QShowEvent]) -> None:
+        # exposure is only reported to the native window
+        window = self.windowHandle()
+        if window is not None:
+            window.removeEventFilter(self)
+            window.installEventFilter(self)
+        self._check_exposed()
+
+    def hideEvent(self, ev: Optional[QHideEvent]) -> None:
+        self._check_exposed()
+
+    def changeEvent(self, ev: Optional[QEvent]) -> None:
+        super().changeEvent(ev)
+        if ev is not None and ev.type() == QEvent.WindowStateChange:
+            self._check_exposed()
+
+    def eventFilter(self, obj: Optional[QObject], ev: Optional[QEvent]) -> bool:
+        if ev is not None and ev.type() == QEvent.Expose:
+            self._check_exposed()
+        return False
+
+    def is_exposed(self) -> bool:
+        """False while the window is hidden, minimized, covered or on a
+        screen that is off, as far as the window system tells"""
+        return self._exposed
+
+    def _check_exposed(self) -> None:
+        window = self.windowHandle()
+        exposed = window is not None and window.isExposed() and self.isVisible() and not self.isMinimized()
+        if exposed == self._exposed:
+            return
+
+        self._exposed = exposed
+        if exposed and self._update_pending:
+            self._update_pending = False
+            self.update()
+        self.sig_exposed_changed.emit(exposed)
+
     def mouseDoubleClickEvent(self, ev: QMouseEvent) -> None:
         self._app.toggle_fullscreen()
 
@@ -72,6 +143,20 @@ class FlashlightWidget(QWidget):
             self._app.show_text_color_dialog()
         elif ev.key() == Qt.Key_B:
             self._app.toggle_borderless()
+        elif ev.key() == Qt.Key_D:
+            self._app.toggle_debug_overlay()
+        elif ev.key() in (Qt.Key_PageDown, Qt.Key_Space):
+            self._app.scroll_pages(1)
+        elif ev.key() == Qt.Key_PageUp:
+            self._app.scroll_pages(-1)
+        elif ev.key() == Qt.Key_Down:
+            self._app.scroll(1)
+        elif ev.key() == Qt.Key_Up:
+            self._app.scroll(-1)
+        elif ev.key() == Qt.Key_Home:
+            self._app.scroll_to_start()
+        elif ev.key() == Qt.Key_End:
+            self._app.scroll_to_end()
 
     def set_fullscreen(self, fullscreen: bool) -> None:
         if fullscreen:
@@ -89,37 +174,88 @@ class FlashlightWidget(QWidget):
             self.setWindowFlags(self.windowFlags() & ~Qt.FramelessWindowHint)
             self.show()
 
+    def set_max_fps(self, fps: Optional[float]) -> None:
+        if fps is None or fps <= 0:
+            self._min_frame_interval_msec = None
+        else:
+            self._min_frame_interval_msec = int(1000 / fps)
+
+    def schedule_update(self) -> None:
+        """Request a repaint, bursts of requests result in a single paint
+        that is delayed as needed to stay within the frame rate cap"""
+        if not self._exposed:
+            self._update_pending = True
+        elif self._min_frame_interval_msec is None or not self._frame_clock.isValid():
+            self.update()
+        elif not self._update_timer.isActive():
+            remaining = self._min_frame_interval_msec - self._frame_clock.elapsed()
+            if remaining <= 0:
+                self.update()
+            else:
+                self._update_timer.start(remaining)
+
+    def set_instrumented(self, instrumented: bool) -> None:
+        """Record paint and layout timings, see stats()"""
+        self._instrumented = instrumented
+        self._renderer.set_instrumented(instrumented)
+
+    def set_debug_overlay(self, debug_overlay: bool) -> None:
+        self._debug_overlay = debug_overlay
+        if debug_overlay:
+            self._debug_timer.start()
+        else:
+            self._debug_timer.stop()
+        self.update()
+
+    def debug_overlay(self) -> bool:
+        return self._debug_overlay
+
+    def stats(self) -> dict[str, RunningStats]:
+        return self._paint_stats.stats()
+
+    def paints_per_sec(self) -> int:
+        """Number of paints within the last second"""
+        return self._paint_stats.paints_per_sec()
+
     def paintEvent(self, ev: QPaintEvent) -> None:
+        self._frame_clock.start()
+        if self._instrumented:
+            start = time.perf_counter()
+
         model = self._app.flashlight_model()
 
-        pal = self.palette()
-        pal.setColor(QPalette.Background, model.background_color())
-        self.setPalette(pal)
+        painter = QPainter(self)
 
-        pal = self.palette()
-        pal.setColor(QPalette.Foreground, model.foreground_color())
-        self.setPalette(pal)
+        source = self._app.text_source()
+        frame = source.frame(self.size(), self.devicePixelRatioF()) if source is not None else None
+        if frame is not None:
+            painter.drawImage(0, 0, frame)
+        else:
+            painter.fillRect(ev.rect(), model.background_color())
+            self._renderer.draw(painter, QRectF(self.rect()), model, self._app.dashboard())
 
-        text = model.text()
-        if text is not None:
-            painter = QPainter(self)
-            painter.setFont(model.font())
-            fm = QFontMetrics(painter.font())
-            rect = fm.size(Qt.AlignCenter, text)
+        if self._instrumented:
+            # the overlay itself is not part of the measurement
+            self._paint_stats.add_paint((time.perf_counter() - start) * 1000)
 
-            src_aspect = rect.width() / rect.height()
-            dst_aspect = self.width() / self.height()
+        if source is not None:
+            source.painted()
 
-            if src_aspect > dst_aspect:
-                sx = self.width() / rect.width()
-                sy = sx
-            else:
-                sy = self.height() / rect.height()
-                sx = sy
+        if self._debug_overlay:
+            self._draw_debug_overlay(painter)
+
+    def _draw_debug_overlay(self, painter: QPainter) -> None:
+        painter.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        metrics = painter.fontMetrics()
+        lines = self._app.debug_report()
 
-            painter.scale(sx, sy)
-            painter.drawText(QRectF(0, 0, self.width() / sx, self.height() / sy),
-                             Qt.AlignCenter, text)
+        margin = 4
+        width = max((metrics.horizontalAdvance(line) for line in lines), default=0)
+        painter.fillRect(0, 0, width + 2 * margin, metrics.lineSpacing() * len(lines) + 2 * margin,
+                         QColor(0, 0, 0, 192))
+        painter.setPen(Qt.white)
+        for i, line in enumerate(lines):
+            painter.drawText(margin, margin + metrics.ascent() + i * metrics.lineSpacing(), line)
 
 
 # EOF #
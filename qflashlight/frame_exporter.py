@@ -0,0 +1,141 @@
+# qflashlight - Simple Qt-based fullscreen flashlight
+# Copyright (C) 2017 Ingo Ruhnke <grumbel@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from typing import BinaryIO, Optional, TYPE_CHECKING
+
+import os
+import sys
+import time
+
+from PyQt5.QtCore import QObject, QRectF, QSize, pyqtSignal
+from PyQt5.QtGui import QImage, QPainter
+
+from qflashlight.interval_timer import IntervalTimer
+from qflashlight.renderer import Renderer
+from qflashlight.stats import PaintStats
+
+if TYPE_CHECKING:
+    from qflashlight.application import Application
+
+
+class FrameExporter(QObject):
+    """Renders the content without a window at a fixed frame rate and
+    writes the frames as PNG files or as raw RGB24 to stdout
+
+    All frames are drawn into the same QImage, the raw output writes
+    its scanlines straight from the image memory."""
+
+    sig_finished = pyqtSignal()
+
+    def __init__(self, app: 'Application', renderer: Renderer, paint_stats: PaintStats,
+                 filename: str, size: QSize, fps: float, frames: Optional[int] = None,
+                 parent: Optional[QObject] = None) -> None:
+        super().__init__(parent)
+
+        self._app = app
+        self._renderer = renderer
+        self._paint_stats = paint_stats
+        self._filename = filename
+        self._frames = frames
+        self._frame_count = 0
+        self._output: Optional[BinaryIO] = sys.stdout.buffer if filename == "-" else None
+
+        self._image = QImage(size, QImage.Format_RGB888)
+        self._painter = QPainter()
+
+        # RGB888 scanlines are padded to 32 bits, so unless the width
+        # is a multiple of four each line has to be written on its own
+        bits = self._image.bits()
+        assert bits is not None
+        bits.setsize(self._image.sizeInBytes())
+        view = memoryview(bits)
+        bytes_per_line = self._image.bytesPerLine()
+        row_bytes = size.width() * 3
+        if bytes_per_line == row_bytes:
+            self._rows = [view]
+        else:
+            self._rows = [view[y * bytes_per_line:y * bytes_per_line + row_bytes]
+                          for y in range(size.height())]
+
+        self._timer = IntervalTimer(1.0 / fps, parent=self)
+        self._timer.sig_timeout.connect(self._on_frame)
+
+    def start(self) -> None:
+        """Start rendering, the first frame comes after one frame interval"""
+        self._timer.start()
+
+    def stop(self) -> None:
+        self._timer.stop()
+
+    def frame_count(self) -> int:
+        return self._frame_count
+
+    def image(self) -> QImage:
+        """The frame buffer, holding the last rendered frame"""
+        return self._image
+
+    def render(self) -> None:
+        start = time.perf_counter()
+
+        model = self._app.flashlight_model()
+        self._painter.begin(self._image)
+        self._painter.fillRect(self._image.rect(), model.background_color())
+        self._renderer.draw(self._painter, QRectF(self._image.rect()), model, self._app.dashboard())
+        self._painter.end()
+
+        self._paint_stats.add_paint((time.perf_counter() - start) * 1000)
+
+    def _on_frame(self) -> None:
+        self.render()
+        try:
+            self._write_frame()
+        except OSError as err:
+            # a closed pipe just means the consumer is done
+            if not isinstance(err, BrokenPipeError):
+                print(f"qflashlight: error: couldn't write frame: {err}", file=sys.stderr)
+            self._finish()
+            return
+
+        self._frame_count += 1
+        if self._frames is not None and self._frame_count >= self._frames:
+            self._finish()
+
+    def _write_frame(self) -> None:
+        if self._output is not None:
+            for row in self._rows:
+                self._output.write(row)
+            self._output.flush()
+        else:
+            filename = self._frame_filename(self._frame_count)
+            # write to a temporary file first, so readers of a file that
+            # is overwritten with every frame never see a partial image
+            tmpfile = filename + ".tmp"
+            if not self._image.save(tmpfile, "PNG"):
+                raise OSError(f"{tmpfile}: couldn't save image")
+            os.replace(tmpfile, filename)
+
+    def _frame_filename(self, frame: int) -> str:
+        if "%" in self._filename:
+            return self._filename % frame
+        else:
+            return self._filename
+
+    def _finish(self) -> None:
+        self._timer.stop()
+        self.sig_finished.emit()
+
+
+# EOF #
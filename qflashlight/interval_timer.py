@@ -0,0 +1,146 @@
+# qflashlight - Simple Qt-based fullscreen flashlight
+# Copyright (C) 2017 Ingo Ruhnke <grumbel@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from typing import Optional
+
+import math
+import time
+
+from PyQt5.QtCore import Qt, QObject, QTimer, pyqtSignal
+
+from qflashlight.stats import RunningStats
+
+
+# an aligned tick that comes less than this before its point on the
+# wall clock waits for it, later ones count as on time
+ALIGN_SLACK_SEC = 0.05
+
+
+class IntervalTimer(QObject):
+    """Repeating timer that schedules every tick against a fixed time
+    base, so late ticks don't accumulate into drift
+
+    With 'align' the ticks land on multiples of the interval on the
+    wall clock, e.g. exactly on the second or minute. Ticks that were
+    missed entirely are skipped. The ticks are always scheduled on the
+    monotonic clock and only their phase is taken from the wall clock,
+    so a wall clock that is set back doesn't hold them up."""
+
+    sig_timeout = pyqtSignal()
+
+    def __init__(self, interval_sec: float, align: bool = False,
+                 parent: Optional[QObject] = None) -> None:
+        super().__init__(parent)
+
+        self._interval_sec = interval_sec
+        self._align = align and interval_sec > 0
+        self._offset_sec = 0.0
+
+        self._next_tick: float = 0.0
+        self._last_tick: float = 0.0
+        self._jitter = RunningStats()
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self._on_timeout)
+
+    def clock(self) -> float:
+        """The clock the ticks are scheduled on, in seconds"""
+        return time.monotonic()
+
+    def last_tick(self) -> float:
+        """The time the last tick was scheduled for"""
+        return self._last_tick
+
+    def jitter(self) -> RunningStats:
+        """How late the ticks fired, in milliseconds"""
+        return self._jitter
+
+    def start(self, offset_sec: Optional[float] = None) -> None:
+        """Start ticking, the first tick comes after one interval or after
+        'offset_sec' seconds, aligned ticks are shifted by 'offset_sec'
+        against the wall clock instead"""
+        now = self.clock()
+        if self._align:
+            self._offset_sec = 0.0 if offset_sec is None else offset_sec
+            self._next_tick = now + self._until_aligned()
+        elif offset_sec is not None:
+            self._next_tick = now + offset_sec
+        else:
+            self._next_tick = now + self._interval_sec
+        self._schedule()
+
+    def stop(self) -> None:
+        self._timer.stop()
+
+    def resume(self) -> None:
+        """Continue on the schedule of the last start() after a stop(),
+        the ticks that were missed in between are skipped"""
+        now = self.clock()
+        if self._align:
+            self._next_tick = now + self._until_aligned()
+        elif self._interval_sec > 0 and self._next_tick <= now:
+            missed = math.floor((now - self._next_tick) / self._interval_sec)
+            self._next_tick += (missed + 1) * self._interval_sec
+        self._schedule()
+
+    def is_active(self) -> bool:
+        return self._timer.isActive()
+
+    def _until_aligned(self) -> float:
+        """Seconds until the next multiple of the interval, shifted by the
+        offset, on the wall clock, more than zero and at most one interval"""
+        wall = time.time()
+        next_wall = (math.floor((wall - self._offset_sec) / self._interval_sec) + 1) * self._interval_sec
+        return next_wall + self._offset_sec - wall
+
+    def _schedule(self) -> None:
+        # round up, firing early would show the previous second
+        delay = max(0.0, self._next_tick - self.clock())
+        self._timer.start(math.ceil(delay * 1000))
+
+    def _on_timeout(self) -> None:
+        now = self.clock()
+        if now < self._next_tick:
+            self._schedule()
+            return
+
+        if self._align:
+            # the monotonic and the wall clock drift apart a little, don't
+            # tick just before the wall clock reaches the point
+            remaining = self._until_aligned()
+            if remaining < min(ALIGN_SLACK_SEC, self._interval_sec / 2):
+                self._next_tick = now + remaining
+                self._schedule()
+                return
+
+        self._jitter.add((now - self._next_tick) * 1000)
+        self._last_tick = self._next_tick
+
+        if self._align:
+            self._next_tick = now + self._until_aligned()
+        elif self._interval_sec > 0:
+            missed = math.floor((now - self._next_tick) / self._interval_sec)
+            self._next_tick += (missed + 1) * self._interval_sec
+        else:
+            self._next_tick = now
+        self._schedule()
+
+        self.sig_timeout.emit()
+
+
+# EOF #
@@ -0,0 +1,228 @@
+# qflashlight - Simple Qt-based fullscreen flashlight
+# Copyright (C) 2017 Ingo Ruhnke <grumbel@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from typing import Optional, TYPE_CHECKING
+
+import math
+import os
+import sys
+
+from PyQt5.QtCore import QObject
+from PyQt5.QtNetwork import QHostAddress, QTcpServer, QTcpSocket
+
+from qflashlight.stats import Histogram, RunningStats
+
+if TYPE_CHECKING:
+    from qflashlight.application import Application
+
+
+# upper limit for the request header, anything longer isn't a scraper
+MAX_REQUEST_LENGTH = 8192
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def resident_memory_bytes() -> Optional[int]:
+    """Resident set size of the current process, None when it is unknown"""
+    try:
+        with open("/proc/self/statm", "r", encoding="ascii") as fin:
+            return int(fin.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsWriter:
+    """Builds a page in the Prometheus text exposition format"""
+
+    def __init__(self) -> None:
+        self._lines: list[str] = []
+
+    def metric(self, name: str, kind: str, help_text: str) -> None:
+        self._lines.append(f"# HELP {name} {help_text}")
+        self._lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name: str, value: float, labels: Optional[dict[str, str]] = None) -> None:
+        if labels:
+            label_str = ",".join(f'{key}="{val}"' for key, val in labels.items())
+            self._lines.append(f"{name}{{{label_str}}} {format_value(value)}")
+        else:
+            self._lines.append(f"{name} {format_value(value)}")
+
+    def counter(self, name: str, value: int, help_text: str) -> None:
+        self.metric(name, "counter", help_text)
+        self.sample(name, value)
+
+    def gauge(self, name: str, value: float, help_text: str) -> None:
+        self.metric(name, "gauge", help_text)
+        self.sample(name, value)
+
+    def timings(self, name: str, stats: RunningStats, help_text: str) -> None:
+        """Add millisecond 'stats' as '{name}_seconds', as histogram when
+        buckets are available and as summary otherwise"""
+        name = f"{name}_seconds"
+        if isinstance(stats, Histogram):
+            self.metric(name, "histogram", help_text)
+            for bound, count in stats.buckets():
+                self.sample(f"{name}_bucket", count, {"le": format_value(bound / 1000)})
+            self.sample(f"{name}_sum", stats.sum() / 1000)
+        else:
+            self.metric(name, "summary", help_text)
+            self.sample(f"{name}_sum", stats.mean() * stats.count() / 1000)
+        self.sample(f"{name}_count", stats.count())
+
+    def text(self) -> str:
+        return "\n".join(self._lines) + "\n"
+
+
+def format_metrics(app: 'Application') -> str:
+    writer = MetricsWriter()
+
+    widget = app.flashlight_widget()
+    widget_stats = widget.stats()
+    writer.counter("qflashlight_paints_total", widget_stats["paint_ms"].count(),
+                   "Number of repaints")
+    for name, stats in widget_stats.items():
+        writer.timings(f"qflashlight_{name.removesuffix('_ms')}", stats,
+                       f"Time spent in {name.removesuffix('_ms').replace('_', ' ')}")
+
+    source = app.text_source()
+    if source is not None:
+        for name, stats in source.stats().items():
+            writer.timings(f"qflashlight_{name.removesuffix('_ms')}", stats,
+                           f"Time spent in {name.removesuffix('_ms').replace('_', ' ')}")
+
+    counters = app.source_counters()
+    group = app.source_counter_group()
+    exits = {name.removeprefix("exit_"): count
+             for name, count in counters.items() if name.startswith("exit_")}
+    if exits:
+        writer.metric(f"qflashlight_{group}_exits_total", "counter",
+                      "Number of command runs by exit code")
+        for code, count in sorted(exits.items()):
+            writer.sample(f"qflashlight_{group}_exits_total", count, {"code": code})
+    for name, count in sorted(counters.items()):
+        if not name.startswith("exit_"):
+            # counters may already carry the group, e.g. pattern_transitions
+            name = name.removeprefix(f"{group}_")
+            writer.counter(f"qflashlight_{group}_{name}_total", count,
+                           f"{group.capitalize()} {name.replace('_', ' ')} count")
+
+    writer.counter("qflashlight_suppressed_updates_total",
+                   app.flashlight_model().suppressed_updates(),
+                   "Number of updates that didn't change anything")
+
+    rss = resident_memory_bytes()
+    if rss is not None:
+        writer.gauge("process_resident_memory_bytes", rss,
+                     "Resident memory size in bytes")
+
+    return writer.text()
+
+
+class MetricsServer(QObject):
+    """Serves the statistics of an Application over HTTP for Prometheus
+
+    Requests are handled from the event loop, a page is only built
+    when it is requested, so an idle server costs nothing."""
+
+    def __init__(self, app: 'Application') -> None:
+        super().__init__()
+
+        self._app = app
+        self._server = QTcpServer(self)
+        self._server.newConnection.connect(self._on_new_connection)
+        self._buffers: dict[QTcpSocket, bytearray] = {}
+
+    def listen(self, address: str, port: int) -> bool:
+        if not self._server.listen(QHostAddress(address), port):
+            print(f"qflashlight: couldn't listen on {address}:{port}: {self._server.errorString()}",
+                  file=sys.stderr)
+            return False
+        return True
+
+    def server_port(self) -> int:
+        return self._server.serverPort()
+
+    def close(self) -> None:
+        self._server.close()
+
+    def _on_new_connection(self) -> None:
+        while self._server.hasPendingConnections():
+            socket = self._server.nextPendingConnection()
+            if socket is None:
+                break
+
+            self._buffers[socket] = bytearray()
+            socket.readyRead.connect(lambda socket=socket: self._on_ready_read(socket))
+            socket.disconnected.connect(lambda socket=socket: self._on_disconnected(socket))
+
+    def _on_disconnected(self, socket: QTcpSocket) -> None:
+        self._buffers.pop(socket, None)
+        socket.deleteLater()
+
+    def _on_ready_read(self, socket: QTcpSocket) -> None:
+        buf = self._buffers.get(socket)
+        if buf is None:
+            return
+
+        buf += bytes(socket.readAll())
+        end = buf.find(b"\r\n\r\n")
+        if end == -1:
+            end = buf.find(b"\n\n")
+        if end == -1:
+            if len(buf) > MAX_REQUEST_LENGTH:
+                self._respond(socket, "431 Request Header Fields Too Large", "")
+            return
+
+        request_line = bytes(buf[:buf.find(b"\n")]).decode("latin-1").strip()
+        self._handle_request(socket, request_line.split())
+
+    def _handle_request(self, socket: QTcpSocket, request: list[str]) -> None:
+        if len(request) != 3 or not request[2].startswith("HTTP/"):
+            self._respond(socket, "400 Bad Request", "")
+        elif request[0] not in ("GET", "HEAD"):
+            self._respond(socket, "405 Method Not Allowed", "")
+        elif request[1].split("?", 1)[0] not in ("/", "/metrics"):
+            self._respond(socket, "404 Not Found", "")
+        else:
+            self._respond(socket, "200 OK", format_metrics(self._app),
+                          head_only=request[0] == "HEAD")
+
+    def _respond(self, socket: QTcpSocket, status: str, body: str, head_only: bool = False) -> None:
+        # the request has been answered, ignore anything that follows
+        self._buffers.pop(socket, None)
+
+        data = body.encode("utf-8")
+        header = (f"HTTP/1.0 {status}\r\n"
+                  f"Content-Type: {CONTENT_TYPE}\r\n"
+                  f"Content-Length: {len(data)}\r\n"
+                  "Connection: close\r\n"
+                  "\r\n").encode("ascii")
+        socket.write(header if head_only else header + data)
+        # closes once the response has been written
+        socket.disconnectFromHost()
+
+
+# EOF #
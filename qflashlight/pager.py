@@ -0,0 +1,235 @@
+# qflashlight - Simple Qt-based fullscreen flashlight
+# Copyright (C) 2017 Ingo Ruhnke <grumbel@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from typing import BinaryIO, Callable, Optional, Union
+
+import bisect
+import mmap
+import os
+
+from qflashlight.interval_timer import IntervalTimer
+from qflashlight.text_limits import TextLimits
+from qflashlight.text_source import TextSource
+
+
+# granularity of the line index, lines within a chunk are found by scanning
+INDEX_CHUNK = 64 * 1024
+
+
+class LineIndex:
+    """Finds the start of lines in a file without storing every offset
+
+    Only the number of newlines before each INDEX_CHUNK bytes is
+    recorded and only as far into the file as was asked for, so memory
+    use is a few bytes per chunk and jumping to a line touches just
+    the chunks up to it once."""
+
+    def __init__(self, data: Union[bytes, mmap.mmap]) -> None:
+        self._data = data
+        self._size = len(data)
+        # newlines within data[:i * INDEX_CHUNK]
+        self._checkpoints: list[int] = [0]
+
+    def size(self) -> int:
+        return self._size
+
+    def reuse(self, other: 'LineIndex') -> None:
+        """Take over the chunks 'other' indexed, when this index covers
+        the same file after data was appended to it"""
+        complete = min(len(other._checkpoints) - 1, other._size // INDEX_CHUNK)
+        self._checkpoints = other._checkpoints[:complete + 1]
+
+    def _is_complete(self) -> bool:
+        return (len(self._checkpoints) - 1) * INDEX_CHUNK >= self._size
+
+    def _extend(self) -> None:
+        start = (len(self._checkpoints) - 1) * INDEX_CHUNK
+        count = self._data[start:start + INDEX_CHUNK].count(b"\n")
+        self._checkpoints.append(self._checkpoints[-1] + count)
+
+        # indexing passes over the whole file once, don't let the pages
+        # it touched stay in the resident set
+        if isinstance(self._data, mmap.mmap) and hasattr(mmap, "MADV_DONTNEED"):
+            self._data.madvise(mmap.MADV_DONTNEED, start, min(INDEX_CHUNK, self._size - start))
+
+    def line_count(self) -> int:
+        while not self._is_complete():
+            self._extend()
+
+        if self._size == 0 or self._data[self._size - 1:self._size] == b"\n":
+            return self._checkpoints[-1]
+        else:
+            return self._checkpoints[-1] + 1
+
+    def line_offset(self, line: int) -> int:
+        """Byte offset at which 'line' starts, the file size for lines
+        past the end"""
+        if line <= 0:
+            return 0
+
+        while self._checkpoints[-1] < line and not self._is_complete():
+            self._extend()
+
+        if self._checkpoints[-1] < line:
+            return self._size
+
+        # the chunk that contains the newline ending the previous line
+        chunk = bisect.bisect_left(self._checkpoints, line) - 1
+        pos = chunk * INDEX_CHUNK - 1
+        for _ in range(line - self._checkpoints[chunk]):
+            pos = self._data.find(b"\n", pos + 1)
+        return pos + 1
+
+
+class Pager(TextSource):
+    """Shows a file one page of lines at a time
+
+    The file is memory-mapped and only the lines of the current page
+    are decoded, so the size of the file doesn't matter. Data appended
+    to the file is picked up on the next page turn."""
+
+    def __init__(self,
+                 text_callback: Callable[[str], None],
+                 filename: str,
+                 lines_per_page: int = 25,
+                 auto_scroll_sec: Optional[float] = None,
+                 text_limits: Optional[TextLimits] = None) -> None:
+        super().__init__(text_callback)
+
+        self._filename = filename
+        self._lines_per_page = max(1, lines_per_page)
+        self._text_limits = text_limits if text_limits is not None else TextLimits()
+
+        self._file: Optional[BinaryIO] = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._index = LineIndex(b"")
+        self._top: int = 0
+
+        self._timer: Optional[IntervalTimer] = None
+        if auto_scroll_sec is not None:
+            self._timer = IntervalTimer(auto_scroll_sec, parent=self)
+            self._timer.sig_timeout.connect(self._on_auto_scroll)
+
+    def start(self) -> None:
+        try:
+            self._file = open(self._filename, "rb")
+        except OSError as err:
+            self._text_callback(str(err))
+            return
+
+        self._remap()
+        self._show()
+
+        if self._timer is not None:
+            self._timer.start()
+
+    def stop(self) -> None:
+        if self._timer is not None:
+            self._timer.stop()
+
+        self._index = LineIndex(b"")
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def top_line(self) -> int:
+        return self._top
+
+    def scroll(self, lines: int) -> None:
+        self._scroll_to(self._top + lines)
+
+    def scroll_pages(self, pages: int) -> None:
+        self._scroll_to(self._top + pages * self._lines_per_page)
+
+    def scroll_to_start(self) -> None:
+        self._scroll_to(0)
+
+    def scroll_to_end(self) -> None:
+        self._remap()
+        self._scroll_to(self._last_top())
+
+    def _last_top(self) -> int:
+        return max(0, self._index.line_count() - self._lines_per_page)
+
+    def _scroll_to(self, top: int) -> None:
+        if self._file is None:
+            return
+
+        self._remap()
+        top = max(0, top)
+        if top > self._top and self._index.line_offset(top) >= self._index.size():
+            # only the last page would need a full index, so only then count all lines
+            top = min(top, self._last_top())
+
+        if top != self._top:
+            self._top = top
+            self._show()
+
+    def _on_auto_scroll(self) -> None:
+        if self._file is None:
+            return
+
+        self._remap()
+        top = self._top + self._lines_per_page
+        if self._index.line_offset(top) >= self._index.size():
+            top = 0
+        self._scroll_to(top)
+
+    def _remap(self) -> None:
+        """Map the file again when its size changed"""
+        if self._file is None:
+            return
+
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+        except OSError:
+            return
+
+        if size == self._index.size():
+            return
+
+        old_index = self._index
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+        if size == 0:
+            # empty files can't be mapped
+            self._index = LineIndex(b"")
+        else:
+            self._mmap = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ)
+            self._index = LineIndex(self._mmap)
+            if size > old_index.size():
+                self._index.reuse(old_index)
+
+    def _show(self) -> None:
+        start = self._index.line_offset(self._top)
+        end = self._index.line_offset(self._top + self._lines_per_page)
+
+        # a page of a few giant lines must not be decoded in full
+        max_bytes = self._text_limits.max_bytes()
+        if max_bytes is not None:
+            end = min(end, start + max_bytes)
+
+        data = self._mmap[start:end] if self._mmap is not None else b""
+        text = self._text_limits.apply(data.decode(errors="replace"))
+        self._text_callback(text.rstrip("\n"))
+
+
+# EOF #
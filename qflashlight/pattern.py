@@ -0,0 +1,193 @@
+# qflashlight - Simple Qt-based fullscreen flashlight
+# Copyright (C) 2017 Ingo Ruhnke <grumbel@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from typing import Optional
+
+import math
+import time
+
+from PyQt5.QtCore import QTimer, Qt
+from PyQt5.QtGui import QColor
+
+from qflashlight.flashlight_model import FlashlightModel
+from qflashlight.stats import Histogram, RunningStats
+from qflashlight.text_source import TextSource
+
+
+# the timer wakes up this early and the remaining time is waited out
+# actively, QTimer alone is only accurate to about a millisecond
+SPIN_SEC = 0.001
+
+
+class PatternStep:
+
+    def __init__(self, color: QColor, frames: int = 1, text: str = "") -> None:
+        self._color = color
+        self._frames = frames
+        self._text = text
+
+    def color(self) -> QColor:
+        return self._color
+
+    def frames(self) -> int:
+        return self._frames
+
+    def text(self) -> str:
+        return self._text
+
+
+def parse_pattern(spec: str) -> list[PatternStep]:
+    """Parse a comma separated list of steps of the form COLOR[*FRAMES][:TEXT],
+    e.g. 'white,black*3' or 'red:STOP,green*2:GO'"""
+    steps = []
+    for i, item in enumerate(spec.split(",")):
+        look, _, text = item.partition(":")
+        color, _, frames = look.strip().partition("*")
+        if not QColor.isValidColor(color):
+            raise ValueError(f"pattern: step {i}: invalid color: {color!r}")
+        if frames and (not frames.isdigit() or int(frames) < 1):
+            raise ValueError(f"pattern: step {i}: frames must be a positive number: {frames!r}")
+        steps.append(PatternStep(QColor(color), int(frames) if frames else 1, text))
+    return steps
+
+
+class PatternPlayer(TextSource):
+    """Plays a sequence of colors and texts, each step lasting a number
+    of frames at 'rate_hz'
+
+    Transitions are scheduled against a fixed time base and steps whose
+    time passed entirely are skipped, so the pattern never drifts. How
+    late each step reached the screen and how many never did is
+    recorded, the windows report their paints with painted()."""
+
+    def __init__(self, model: FlashlightModel, steps: list[PatternStep], rate_hz: float) -> None:
+        super().__init__(model.set_text)
+
+        self._model = model
+        self._steps = steps
+        self._frame_sec = 1.0 / rate_hz
+
+        self._start_time = 0.0
+        self._next_index = 0
+        # frames since the start at which the next step is due
+        self._next_frame = 0
+
+        # time the current step was due and whether it was painted yet
+        self._due = 0.0
+        self._painted = True
+        # actual and intended time of the last painted step
+        self._last_paint: Optional[tuple[float, float]] = None
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self._on_timeout)
+
+        self._timer_late = RunningStats()
+        self._paint_late = Histogram()
+        self._period_error = RunningStats()
+        self._transitions = 0
+        self._skipped_steps = 0
+        self._dropped_frames = 0
+
+    def start(self) -> None:
+        self._start_time = time.perf_counter()
+        self._next_index = 0
+        self._next_frame = 0
+        self._painted = True
+        self._last_paint = None
+        self._on_timeout()
+
+    def stop(self) -> None:
+        self._timer.stop()
+
+    def set_suspended(self, suspended: bool) -> None:
+        # nobody is looking, so the pattern starts over when shown again
+        if suspended:
+            self._timer.stop()
+        elif not self._timer.isActive():
+            self.start()
+
+    def stats(self) -> dict[str, RunningStats]:
+        return {"pattern_timer_late_ms": self._timer_late,
+                "pattern_paint_late_ms": self._paint_late,
+                "pattern_period_error_ms": self._period_error}
+
+    def counters(self) -> dict[str, int]:
+        return {"pattern_transitions": self._transitions,
+                "pattern_skipped_steps": self._skipped_steps,
+                "pattern_dropped_frames": self._dropped_frames}
+
+    def counter_group(self) -> str:
+        return "pattern"
+
+    def painted(self) -> None:
+        if self._painted:
+            return
+
+        now = time.perf_counter()
+        self._painted = True
+        self._paint_late.add((now - self._due) * 1000)
+        if self._last_paint is not None:
+            actual, intended = self._last_paint
+            self._period_error.add(((now - actual) - (self._due - intended)) * 1000)
+        self._last_paint = (now, self._due)
+
+    def _time_of(self, frame: int) -> float:
+        return self._start_time + frame * self._frame_sec
+
+    def _on_timeout(self) -> None:
+        due = self._time_of(self._next_frame)
+        if time.perf_counter() < due - SPIN_SEC:
+            self._schedule(due)
+            return
+
+        while time.perf_counter() < due:
+            pass
+        now = time.perf_counter()
+
+        index = self._next_index
+        frame = self._next_frame
+        while now >= self._time_of(frame + self._steps[index].frames()):
+            frame += self._steps[index].frames()
+            index = (index + 1) % len(self._steps)
+            self._skipped_steps += 1
+
+        if not self._painted:
+            # the previous step was replaced before any window showed it
+            self._dropped_frames += 1
+
+        step = self._steps[index]
+        self._due = self._time_of(frame)
+        self._timer_late.add((now - self._due) * 1000)
+        self._transitions += 1
+
+        # a step that looks like the previous one needs no paint
+        unchanged = step.color() == self._model.background_color() and step.text() == self._model.text()
+        self._painted = unchanged
+        self._model.set_background_color(step.color())
+        self._text_callback(step.text())
+
+        self._next_index = (index + 1) % len(self._steps)
+        self._next_frame = frame + step.frames()
+        self._schedule(self._time_of(self._next_frame))
+
+    def _schedule(self, due: float) -> None:
+        delay = due - SPIN_SEC - time.perf_counter()
+        self._timer.start(max(0, math.floor(delay * 1000)))
+
+
+# EOF #
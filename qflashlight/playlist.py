@@ -0,0 +1,419 @@
+# qflashlight - Simple Qt-based fullscreen flashlight
+# Copyright (C) 2017 Ingo Ruhnke <grumbel@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from typing import Any, Optional
+
+import collections
+import json
+import os
+import time
+
+from PyQt5.QtCore import QObject, QRectF, QRunnable, QSize, QThreadPool, QTimer, Qt, pyqtSignal
+from PyQt5.QtGui import QColor, QFont, QFontDatabase, QImage, QPainter
+
+from qflashlight.flashlight_model import FlashlightModel
+from qflashlight.stats import RunningStats
+from qflashlight.text_layout import TextLayout
+from qflashlight.text_limits import TextLimits
+from qflashlight.text_source import TextSource
+
+
+DEFAULT_SLIDE_DURATION = 10.0
+
+# upper limit of the memory used by pre-rendered slides
+DEFAULT_FRAME_CACHE_BYTES = 64 * 1024 * 1024
+
+# number of upcoming slides that are rendered in the background
+PRERENDER_AHEAD = 2
+
+# number of window sizes slides are rendered for, one per screen
+MAX_FRAME_SIZES = 4
+
+PLAYLIST_KEYS = {"duration", "slides"}
+SLIDE_KEYS = {"text", "file", "duration"}
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate_playlist(config: Any) -> dict[str, Any]:
+    """Check the structure of a playlist, which looks like:
+
+    {"duration": 10,
+     "slides": [{"text": "Welcome"}, {"file": "menu.txt", "duration": 30}]}
+
+    'duration' is optional and the default for the slides."""
+    if not isinstance(config, dict):
+        raise ValueError("playlist: not an object")
+
+    unknown = set(config) - PLAYLIST_KEYS
+    if unknown:
+        raise ValueError(f"playlist: unknown keys: {', '.join(sorted(unknown))}")
+
+    duration = config.get("duration")
+    if duration is not None and not (_is_number(duration) and duration > 0):
+        raise ValueError(f"playlist: duration must be a positive number: {duration!r}")
+
+    slides = config.get("slides")
+    if not isinstance(slides, list) or not slides:
+        raise ValueError("playlist: slides must be a non-empty list")
+
+    for i, slide in enumerate(slides):
+        if not isinstance(slide, dict):
+            raise ValueError(f"playlist: slide {i}: not an object")
+
+        unknown = set(slide) - SLIDE_KEYS
+        if unknown:
+            raise ValueError(f"playlist: slide {i}: unknown keys: {', '.join(sorted(unknown))}")
+
+        if ("text" in slide) == ("file" in slide):
+            raise ValueError(f"playlist: slide {i}: needs either text or file")
+
+        for key in ("text", "file"):
+            if key in slide and not isinstance(slide[key], str):
+                raise ValueError(f"playlist: slide {i}: {key} must be a string")
+
+        duration = slide.get("duration")
+        if duration is not None and not (_is_number(duration) and duration > 0):
+            raise ValueError(f"playlist: slide {i}: duration must be a positive number")
+
+    return config
+
+
+def load_playlist(filename: str) -> dict[str, Any]:
+    """Read a playlist, files of the slides are relative to the playlist
+    and made absolute"""
+    try:
+        with open(filename, encoding="utf-8") as fin:
+            config = json.load(fin)
+    except OSError as err:
+        raise ValueError(f"couldn't read {filename}: {err.strerror}") from err
+    except json.JSONDecodeError as err:
+        raise ValueError(f"{filename}: {err}") from err
+
+    config = validate_playlist(config)
+
+    directory = os.path.dirname(os.path.abspath(filename))
+    for slide in config["slides"]:
+        if "file" in slide:
+            slide["file"] = os.path.join(directory, slide["file"])
+
+    return config
+
+
+def render_frame(text: str, font: QFont, fgcolor: QColor, bgcolor: QColor,
+                 size: QSize, device_pixel_ratio: float) -> QImage:
+    """Draw 'text' the way FlashlightWidget does into a new image of
+    'size' device pixels, only touches its arguments, so it can run in
+    any thread"""
+    image = QImage(size, QImage.Format_RGB32)
+    image.setDevicePixelRatio(device_pixel_ratio)
+    image.fill(bgcolor)
+    if text:
+        painter = QPainter(image)
+        painter.setPen(fgcolor)
+        TextLayout(text, font).draw(painter, QRectF(0, 0,
+                                                    size.width() / device_pixel_ratio,
+                                                    size.height() / device_pixel_ratio))
+        painter.end()
+    return image
+
+
+class FrameCache:
+    """Rendered frames, the least recently used ones are dropped once
+    all of them together take more than 'max_bytes'"""
+
+    def __init__(self, max_bytes: int = DEFAULT_FRAME_CACHE_BYTES) -> None:
+        self._max_bytes = max_bytes
+        self._bytes = 0
+        self._frames: collections.OrderedDict[Any, QImage] = collections.OrderedDict()
+
+    def get(self, key: Any) -> Optional[QImage]:
+        image = self._frames.get(key)
+        if image is not None:
+            self._frames.move_to_end(key)
+        return image
+
+    def contains(self, key: Any) -> bool:
+        return key in self._frames
+
+    def put(self, key: Any, image: QImage) -> None:
+        old = self._frames.pop(key, None)
+        if old is not None:
+            self._bytes -= old.sizeInBytes()
+
+        self._frames[key] = image
+        self._bytes += image.sizeInBytes()
+
+        # always keep the newest frame, even when it alone is too big
+        while self._bytes > self._max_bytes and len(self._frames) > 1:
+            _, dropped = self._frames.popitem(last=False)
+            self._bytes -= dropped.sizeInBytes()
+
+    def clear(self) -> None:
+        self._frames.clear()
+        self._bytes = 0
+
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+
+class Slide:
+
+    def __init__(self, text: Optional[str], filename: Optional[str], duration_sec: float) -> None:
+        self._text = text
+        self._filename = filename
+        self._duration_sec = duration_sec
+
+    def duration_sec(self) -> float:
+        return self._duration_sec
+
+    def read_text(self, text_limits: TextLimits) -> str:
+        """The text of the slide, files are read again every time"""
+        if self._filename is None:
+            return text_limits.apply(self._text or "")
+
+        try:
+            with open(self._filename, "rb") as fin:
+                return text_limits.read_file(fin).rstrip("\n")
+        except OSError as err:
+            return str(err)
+
+
+class _RenderSignals(QObject):
+
+    sig_rendered = pyqtSignal(object, QImage, float)
+
+
+class _RenderTask(QRunnable):
+
+    def __init__(self, key: Any, text: str, font: QFont, fgcolor: QColor, bgcolor: QColor,
+                 size: QSize, device_pixel_ratio: float, signals: _RenderSignals) -> None:
+        super().__init__()
+
+        self._key = key
+        self._text = text
+        self._font = font
+        self._fgcolor = fgcolor
+        self._bgcolor = bgcolor
+        self._size = size
+        self._device_pixel_ratio = device_pixel_ratio
+        self._signals = signals
+
+    def run(self) -> None:
+        start = time.perf_counter()
+        image = render_frame(self._text, self._font, self._fgcolor, self._bgcolor,
+                             self._size, self._device_pixel_ratio)
+        self._signals.sig_rendered.emit(self._key, image, (time.perf_counter() - start) * 1000)
+
+
+class Playlist(TextSource):
+    """Cycles through a list of texts and files, each shown for its own
+    duration
+
+    The upcoming slides are rendered into images on worker threads and
+    kept in a FrameCache, so that switching to them is a single image
+    copy in the window instead of a text layout."""
+
+    def __init__(self, model: FlashlightModel, config: dict[str, Any],
+                 default_duration: float = DEFAULT_SLIDE_DURATION,
+                 text_limits: Optional[TextLimits] = None,
+                 cache_bytes: int = DEFAULT_FRAME_CACHE_BYTES) -> None:
+        super().__init__(model.set_text)
+
+        self._model = model
+        self._text_limits = text_limits if text_limits is not None else TextLimits()
+
+        duration = config.get("duration", default_duration)
+        self._slides = [Slide(slide.get("text"), slide.get("file"), slide.get("duration", duration))
+                        for slide in config["slides"]]
+
+        self._index = 0
+        self._text = ""
+        self._suspended = False
+        # text of the upcoming slides by index, read once per round
+        # when the slide before them comes up, never while painting
+        self._texts: dict[int, str] = {}
+
+        self._cache = FrameCache(cache_bytes)
+        # sizes in device pixels and pixel ratios the windows last asked for
+        self._sizes: collections.OrderedDict[tuple[int, int, float], None] = collections.OrderedDict()
+        self._pending: set[Any] = set()
+
+        self._signals = _RenderSignals(self)
+        self._signals.sig_rendered.connect(self._on_rendered)
+        self._thread_pool = QThreadPool(self)
+        self._thread_pool.setMaxThreadCount(2)
+        self._threaded = QFontDatabase.supportsThreadedFontRendering()
+
+        # tasks rendered in the GUI thread when fonts can't be used in
+        # other threads, one per event loop iteration
+        self._gui_tasks: collections.deque[_RenderTask] = collections.deque()
+        self._gui_timer = QTimer(self)
+        self._gui_timer.setSingleShot(True)
+        self._gui_timer.timeout.connect(self._run_gui_task)
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self._next_slide)
+
+        self._render_time = RunningStats()
+        self._slides_shown = 0
+        self._frames_rendered = 0
+        self._cache_hits = 0
+        self._cache_misses = 0
+
+    def start(self) -> None:
+        self._show_slide(0)
+
+    def stop(self) -> None:
+        self._timer.stop()
+        self._gui_timer.stop()
+        self._gui_tasks.clear()
+        self._thread_pool.clear()
+        self._thread_pool.waitForDone()
+        self._pending.clear()
+        self._texts.clear()
+        self._cache.clear()
+
+    def set_suspended(self, suspended: bool) -> None:
+        # slides keep changing, but nothing is read or rendered ahead
+        self._suspended = suspended
+        if not suspended:
+            self._read_upcoming()
+            self._prerender_upcoming()
+
+    def stats(self) -> dict[str, RunningStats]:
+        return {"slide_render_ms": self._render_time}
+
+    def counters(self) -> dict[str, int]:
+        return {"slides_shown": self._slides_shown,
+                "frames_rendered": self._frames_rendered,
+                "frame_cache_hits": self._cache_hits,
+                "frame_cache_misses": self._cache_misses}
+
+    def counter_group(self) -> str:
+        return "playlist"
+
+    def frame(self, size: QSize, device_pixel_ratio: float = 1.0) -> Optional[QImage]:
+        if self._model.text() != self._text:
+            return None
+
+        sizes = (round(size.width() * device_pixel_ratio),
+                 round(size.height() * device_pixel_ratio),
+                 device_pixel_ratio)
+        image = self._cache.get(self._frame_key(self._text, sizes))
+        if image is not None:
+            self._cache_hits += 1
+            return image
+
+        # draw this one directly and have it and the next slides ready
+        # for the following paints
+        self._cache_misses += 1
+        self._sizes[sizes] = None
+        self._sizes.move_to_end(sizes)
+        if len(self._sizes) > MAX_FRAME_SIZES:
+            self._sizes.popitem(last=False)
+        self._prerender(self._text, sizes)
+        self._prerender_upcoming()
+        return None
+
+    def _frame_key(self, text: str, sizes: tuple[int, int, float]) -> Any:
+        return (text,
+                self._model.font().key(),
+                self._model.foreground_color().rgba(),
+                self._model.background_color().rgba()) + sizes
+
+    def _show_slide(self, index: int) -> None:
+        self._index = index
+        text = self._texts.pop(index, None)
+        self._text = text if text is not None else self._slides[index].read_text(self._text_limits)
+        self._slides_shown += 1
+        self._text_callback(self._text)
+
+        self._timer.start(int(self._slides[index].duration_sec() * 1000))
+        self._read_upcoming()
+        self._prerender_upcoming()
+
+    def _upcoming(self) -> list[int]:
+        return [(self._index + i) % len(self._slides)
+                for i in range(1, min(PRERENDER_AHEAD, len(self._slides) - 1) + 1)]
+
+    def _read_upcoming(self) -> None:
+        if self._suspended:
+            return
+
+        for index in self._upcoming():
+            if index not in self._texts:
+                self._texts[index] = self._slides[index].read_text(self._text_limits)
+
+    def _next_slide(self) -> None:
+        self._show_slide((self._index + 1) % len(self._slides))
+
+    def _prerender_upcoming(self) -> None:
+        if self._suspended or not self._sizes:
+            return
+
+        for index in self._upcoming():
+            text = self._texts.get(index)
+            if text is not None:
+                for sizes in self._sizes:
+                    self._prerender(text, sizes)
+
+    def _prerender(self, text: str, sizes: tuple[int, int, float]) -> None:
+        key = self._frame_key(text, sizes)
+        if key in self._pending or self._cache.contains(key):
+            return
+
+        self._pending.add(key)
+        task = _RenderTask(key, text,
+                           QFont(self._model.font()),
+                           QColor(self._model.foreground_color()),
+                           QColor(self._model.background_color()),
+                           QSize(sizes[0], sizes[1]), sizes[2],
+                           self._signals)
+        if self._threaded:
+            self._thread_pool.start(task)
+        else:
+            # text can only be drawn in the GUI thread here, still
+            # render ahead of time, but in between the other events
+            self._gui_tasks.append(task)
+            if not self._gui_timer.isActive():
+                self._gui_timer.start(0)
+
+    def _run_gui_task(self) -> None:
+        if self._gui_tasks:
+            self._gui_tasks.popleft().run()
+        if self._gui_tasks:
+            self._gui_timer.start(0)
+
+    def _on_rendered(self, key: Any, image: QImage, render_ms: float) -> None:
+        if key not in self._pending:
+            # rendered for a playlist that was stopped in the meantime
+            return
+
+        self._pending.discard(key)
+        self._cache.put(key, image)
+        self._frames_rendered += 1
+        self._render_time.add(render_ms)
+
+
+# EOF #
@@ -0,0 +1,61 @@
+# qflashlight - Simple Qt-based fullscreen flashlight
+# Copyright (C) 2017 Ingo Ruhnke <grumbel@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import shutil
+import signal
+
+from PyQt5.QtCore import QCoreApplication, QProcess
+
+# starts the command as leader of a new process group, missing on some systems
+SETSID = shutil.which("setsid")
+
+
+def start_process_group(process: QProcess, program: str, arguments: list[str]) -> None:
+    """Start 'program' in a process group of its own, so that
+    kill_process() also reaches everything it started"""
+    if SETSID is not None:
+        # setsid execs in place, the process id is the group id
+        process.start(SETSID, [program] + arguments)
+    else:
+        process.start(program, arguments)
+
+
+def kill_process(process: QProcess) -> None:
+    """Kill 'process' and its process group, its signals are disconnected
+    and the QProcess deletes itself once the process was reaped"""
+    for sig in (process.readyReadStandardOutput, process.finished, process.errorOccurred):
+        try:
+            sig.disconnect()
+        except TypeError:
+            # nothing connected
+            pass
+    process.finished.connect(process.deleteLater)
+    # outlive the owner until the process is reaped
+    process.setParent(QCoreApplication.instance())
+
+    pid = process.processId()
+    if pid > 0:
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except OSError:
+            # not a group leader without setsid, or already gone
+            pass
+    process.kill()
+
+
+# EOF #
@@ -17,54 +17,137 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
+from typing import Any, Optional, TYPE_CHECKING
+
 import argparse
+import cProfile
+import os
 import re
 import signal
 import sys
 
-from PyQt5.QtCore import Qt, QRect
-from PyQt5.QtGui import QColor, QFont
-from PyQt5.QtWidgets import QApplication
+# Qt is imported on demand, so that parsing the arguments and handing
+# them over to a running instance with --reuse stays fast
+from qflashlight.control_client import send_commands
+from qflashlight.control_protocol import default_socket_path, socket_path
+from qflashlight.text_limits import TextLimits
 
-from qflashlight.application import Application
+if TYPE_CHECKING:
+    from qflashlight.application import Application
 
 
-def parse_args(args: list[str]) -> argparse.Namespace:
-    def QRect_from_string(text: str) -> QRect:
+# size of --export frames without --geometry
+DEFAULT_EXPORT_SIZE = (1920, 1080)
+
+# options that replace the displayed content
+CONTENT_ARGS = {"FILE", "text", "command", "clock", "countdown", "stopwatch", "dashboard", "panel", "pager",
+                "playlist", "slide", "pattern"}
+
+
+def make_parser() -> argparse.ArgumentParser:
+    def geometry_from_string(text: str) -> tuple[int, int, int, int]:
         m = re.match(r'^(\d+)x(\d+)\+(\d+)\+(\d+)$', text)
         if not m:
             raise ValueError(f"couldn't parse geometry (WxH+X+Y): {text}")
 
-        return QRect(int(m.group(3)),
-                     int(m.group(4)),
-                     int(m.group(1)),
-                     int(m.group(2)))
+        return (int(m.group(3)),
+                int(m.group(4)),
+                int(m.group(1)),
+                int(m.group(2)))
+
+    geometry_from_string.__name__ = "geometry"
+
+    def color_from_string(text: str) -> str:
+        from PyQt5.QtGui import QColor
+
+        if not QColor.isValidColor(text):
+            raise ValueError(f"invalid color name: {text}")
+
+        return text
+
+    color_from_string.__name__ = "color"
+
+    def duration_from_string(text: str) -> float:
+        from qflashlight.sources import parse_duration
+
+        return parse_duration(text)
+
+    duration_from_string.__name__ = "duration"
+
+    def address_from_string(text: str) -> tuple[str, int]:
+        address, _, port = text.rpartition(":")
+        if not port.isdigit() or not 0 < int(port) < 65536:
+            raise ValueError(f"couldn't parse address ([ADDRESS:]PORT): {text}")
+        return (address.strip("[]") or "127.0.0.1", int(port))
+
+    address_from_string.__name__ = "address"
+
+    def positive_int(text: str) -> int:
+        value = int(text)
+        if value < 1:
+            raise ValueError(f"not a positive number: {text}")
+        return value
+
+    positive_int.__name__ = "number"
+
+    def positive_float(text: str) -> float:
+        value = float(text)
+        if not value > 0:
+            raise ValueError(f"not a positive number: {text}")
+        return value
+
+    positive_float.__name__ = "number"
+
+    def export_from_string(text: str) -> str:
+        if "%" in text:
+            try:
+                text % 0
+            except (TypeError, ValueError) as err:
+                raise ValueError(f"invalid frame number pattern: {text}") from err
+        return text
 
-    QRect_from_string.__name__ = "QRect"
+    export_from_string.__name__ = "filename"
 
-    def QColor_from_string(text: str) -> QColor:
-        color = QColor(text)
-        if not color.isValid():
-            raise ValueError("invalid color name: ")
+    def dashboard_from_file(filename: str) -> dict[str, Any]:
+        from qflashlight.dashboard import load_dashboard
 
-        return color
+        try:
+            return load_dashboard(filename)
+        except ValueError as err:
+            raise argparse.ArgumentTypeError(str(err)) from err
 
-    QColor_from_string.__name__ = "QColor"
+    def playlist_from_file(filename: str) -> dict[str, Any]:
+        from qflashlight.playlist import load_playlist
 
-    def QFont_from_string(text: str) -> QFont:
-        return QFont(text)
+        try:
+            return load_playlist(filename)
+        except ValueError as err:
+            raise argparse.ArgumentTypeError(str(err)) from err
 
-    QFont_from_string.__name__ = "QFont"
+    def pattern_from_string(text: str) -> str:
+        from qflashlight.pattern import parse_pattern
+
+        parse_pattern(text)
+        return text
+
+    pattern_from_string.__name__ = "pattern"
+
+    def delimiter_from_string(text: str) -> str:
+        if not text:
+            raise ValueError("empty delimiter")
+        return text.encode("latin-1", "backslashreplace").decode("unicode_escape")
+
+    delimiter_from_string.__name__ = "delimiter"
 
     parser = argparse.ArgumentParser(description="QFlashlight - Fill the screen with a solid color")
     parser.add_argument("FILE", nargs="?")
 
     style = parser.add_argument_group("Style")
-    style.add_argument("-c", "--color", metavar="COLOR", type=QColor_from_string, default=Qt.black,
+    style.add_argument("-c", "--color", metavar="COLOR", type=color_from_string, default=None,
                        help="Color to use for the background (#FFF, #FFFFFF or name)")
-    style.add_argument("-T", "--text-color", metavar="COLOR", type=QColor_from_string, default=Qt.white,
+    style.add_argument("-T", "--text-color", metavar="COLOR", type=color_from_string, default=None,
                        help="Color to use for text")
-    style.add_argument("-F", "--font", metavar="FONT", type=QFont_from_string, default=QFont(),
+    style.add_argument("-F", "--font", metavar="FONT", type=str, default=None,
                        help="Use FONT to display text")
 
     content = parser.add_argument_group("Content")
@@ -72,8 +155,71 @@ def parse_args(args: list[str]) -> argparse.Namespace:
                          help="Display text")
     content.add_argument("-C", "--command", metavar="CMD", type=str, default=None,
                          help="Runs CMD and shows the output")
-    content.add_argument("-n", "--interval", metavar="SECONDS", type=float, default=None,
-                         help="Refresh the screen and rerun command every SECONDS seconds (default: None)")
+    content.add_argument("-n", "--interval", metavar="SECONDS", type=positive_float, default=None,
+                         help="Refresh the screen and rerun command or reread FILE every SECONDS seconds "
+                         "(default: None)")
+    content.add_argument("--watch", action="store_true", default=False,
+                         help="Reread FILE whenever it changes")
+    content.add_argument("--clock", metavar="FORMAT", type=str, nargs="?", const="%H:%M:%S", default=None,
+                         help="Show the current time formatted with strftime() FORMAT (default: %%H:%%M:%%S)")
+    content.add_argument("--countdown", metavar="DURATION", type=duration_from_string, default=None,
+                         help="Count down from DURATION given as SECONDS, MM:SS or HH:MM:SS")
+    content.add_argument("--stopwatch", action="store_true", default=False,
+                         help="Show the time elapsed since the start")
+    content.add_argument("--align", action="store_true", default=False,
+                         help="Rerun the command on wall clock multiples of the interval, "
+                         "e.g. exactly on the second")
+    content.add_argument("--timeout", metavar="SECONDS", type=positive_float, default=None,
+                         help="Kill the command when it runs longer than SECONDS seconds (default: None)")
+    content.add_argument("--overlap", metavar="POLICY", choices=["skip", "queue", "kill"],
+                         default="skip",
+                         help="What to do when the command is still running on the next refresh: "
+                         "skip, queue or kill (default: skip)")
+    content.add_argument("--persistent-shell", action="store_true", default=False,
+                         help="Keep a single shell running and feed it CMD on every refresh "
+                         "instead of starting a new shell each time")
+    content.add_argument("--stream", action="store_true", default=False,
+                         help="Start CMD once and show its output as it arrives")
+    content.add_argument("--lines", metavar="N", type=positive_int, default=1,
+                         help="Show the last N lines of the stream (default: 1)")
+    content.add_argument("--delimiter", metavar="STR", type=delimiter_from_string, default=None,
+                         help="Split the stream into frames at STR (e.g. '\\f') and show the last frame")
+    content.add_argument("--max-buffer", metavar="BYTES", type=positive_int, default=1024 * 1024,
+                         help="Limit incomplete lines or frames of the stream to BYTES (default: 1048576)")
+    content.add_argument("--pager", action="store_true", default=False,
+                         help="Show FILE a page at a time, page with PageUp, PageDown, Space, Home and End")
+    content.add_argument("--page-lines", metavar="N", type=positive_int, default=25,
+                         help="Number of lines per page with --pager (default: 25)")
+    content.add_argument("--auto-scroll", metavar="SECONDS", type=positive_float, default=None,
+                         help="Turn the --pager page every SECONDS seconds, starting over at the end")
+    content.add_argument("--max-bytes", metavar="BYTES", type=positive_int, default=65536,
+                         help="Show at most BYTES bytes of the text, the command output or FILE (default: 65536)")
+    content.add_argument("--max-lines", metavar="N", type=positive_int, default=1000,
+                         help="Show at most N lines of the text, the command output or FILE (default: 1000)")
+    content.add_argument("--tail", action="store_true", default=False,
+                         help="Keep the end of text that is over the limits instead of the beginning")
+    content.add_argument("--dashboard", metavar="FILE", type=dashboard_from_file, default=None,
+                         help="Split the window into the panels described by the JSON file FILE")
+    content.add_argument("--panel", metavar="CMD", action="append", default=None,
+                         help="Add a dashboard panel showing the output of CMD, can be given multiple times")
+    content.add_argument("--columns", metavar="N", type=positive_int, default=None,
+                         help="Arrange the dashboard panels in N columns (default: square grid)")
+    content.add_argument("--jobs", metavar="N", type=positive_int, default=None,
+                         help="Run at most N dashboard commands at the same time (default: 4)")
+    content.add_argument("--playlist", metavar="FILE", type=playlist_from_file, default=None,
+                         help="Cycle through the texts and files listed in the JSON file FILE")
+    content.add_argument("--slide", metavar="FILE", action="append", default=None,
+                         help="Add a playlist slide showing FILE, can be given multiple times")
+    content.add_argument("--slide-duration", metavar="SECONDS", type=positive_float, default=10.0,
+                         help="Show each slide for SECONDS seconds unless the playlist says otherwise "
+                         "(default: 10)")
+    content.add_argument("--frame-cache", metavar="MB", type=positive_int, default=64,
+                         help="Keep at most MB megabytes of pre-rendered slides (default: 64)")
+    content.add_argument("--pattern", metavar="STEPS", type=pattern_from_string, default=None,
+                         help="Flash the comma separated steps COLOR[*FRAMES][:TEXT] over and over, "
+                         "e.g. 'white,black*3'")
+    content.add_argument("--pattern-rate", metavar="HZ", type=positive_float, default=None,
+                         help="Play --pattern at HZ frames per second (default: refresh rate of the screen)")
 
     window = parser.add_argument_group("Window")
     window.add_argument("-f", "--fullscreen", action="store_true", default=False,
@@ -84,41 +230,210 @@ def parse_args(args: list[str]) -> argparse.Namespace:
                         help="Hide the mouse cursor")
     window.add_argument("-b", "--borderless", action="store_true", default=False,
                         help="Run the window without a border")
-    window.add_argument("-g", "--geometry", metavar="WxH+X+Y", type=QRect_from_string, default=None,
+    window.add_argument("-g", "--geometry", metavar="WxH+X+Y", type=geometry_from_string, default=None,
                         help="Set the size and position of the window")
+    window.add_argument("--preview-fps", metavar="FPS", type=float, default=30.0,
+                        help="Limit the live preview while editing text or colors to FPS updates per second, "
+                        "0 for no limit (default: 30)")
+    window.add_argument("--all-screens", action="store_true", default=False,
+                        help="Cover every screen with its own window, including screens plugged in later")
+    window.add_argument("--screen", metavar="NAME", action="append", default=None,
+                        help="Cover the screen NAME with its own window, can be given multiple times")
+    window.add_argument("--max-fps", metavar="FPS", type=float, default=None,
+                        help="Limit repaints to FPS frames per second (default: None)")
+
+    control = parser.add_argument_group("Control")
+    control.add_argument("--control-socket", metavar="PATH", type=socket_path, nargs="?", const=default_socket_path(),
+                         default=None,
+                         help="Accept commands from qflashlight-ctl on the local socket PATH, "
+                         f"relative to the current directory (default: {default_socket_path()})")
+    control.add_argument("--reuse", action="store_true", default=False,
+                         help="Apply the options to an already running instance instead of starting a new one, "
+                         "start a new instance listening on the control socket when there is none")
+
+    control.add_argument("--metrics", metavar="[ADDRESS:]PORT", type=address_from_string, default=None,
+                         help="Serve statistics in the Prometheus text format on http://ADDRESS:PORT/metrics "
+                         "(default address: 127.0.0.1)")
+
+    export = parser.add_argument_group("Export")
+    export.add_argument("--export", metavar="FILE", type=export_from_string, default=None,
+                        help="Render without a window into the PNG file FILE, overwritten with every frame "
+                        "unless it contains a frame number pattern like frame%%04d.png, "
+                        "'-' streams raw RGB24 frames to stdout, the size is taken from --geometry "
+                        f"(default: {DEFAULT_EXPORT_SIZE[0]}x{DEFAULT_EXPORT_SIZE[1]})")
+    export.add_argument("--export-fps", metavar="FPS", type=positive_float, default=25.0,
+                        help="Render FPS frames per second with --export, the first after one frame (default: 25)")
+    export.add_argument("--frames", metavar="N", type=positive_int, default=None,
+                        help="Quit after exporting N frames (default: no limit)")
+
+    debug = parser.add_argument_group("Debug")
+    debug.add_argument("--print-stats", action="store_true", default=False,
+                       help="Print refresh timing statistics on exit")
+    debug.add_argument("--stats-file", metavar="FILE", type=str, default=None,
+                       help="Periodically append timing statistics to FILE, '-' for stderr")
+    debug.add_argument("--stats-interval", metavar="SECONDS", type=positive_float, default=10.0,
+                       help="Write statistics to the --stats-file every SECONDS seconds (default: 10)")
+    debug.add_argument("--profile", metavar="FILE", type=str, default=None,
+                       help="Run under cProfile and write the profile to FILE on exit, "
+                       "view with 'python3 -m pstats FILE'")
+
+    return parser
 
-    return parser.parse_args(args)
 
+def parse_args(args: list[str]) -> argparse.Namespace:
+    return make_parser().parse_args(args)
+
+
+def explicit_args(args: list[str]) -> set[str]:
+    """The destinations of all options that are given in 'args'"""
+    parser = make_parser()
+    for action in parser._actions:  # pylint: disable=protected-access
+        action.default = argparse.SUPPRESS
+    return set(vars(parser.parse_args(args)))
+
+
+def args_to_json(args: argparse.Namespace, explicit: set[str]) -> dict[str, Any]:
+    return {dest: getattr(args, dest) for dest in explicit}
+
+
+def value_from_json(action: argparse.Action, value: Any) -> Any:
+    """Check that 'value' is what parsing the option of 'action' would
+    have produced, raises ValueError otherwise"""
+    kind = getattr(action.type, "__name__", None)
+
+    if value is None and action.default is None:
+        return None
+    elif isinstance(action.default, bool):
+        if not isinstance(value, bool):
+            raise ValueError(f"{action.dest}: not a boolean: {value!r}")
+        return value
+    elif isinstance(action, argparse._AppendAction):  # pylint: disable=protected-access
+        if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+            raise ValueError(f"{action.dest}: not a list of strings: {value!r}")
+        return value
+    elif action.dest == "dashboard":
+        from qflashlight.dashboard import validate_dashboard
+
+        return validate_dashboard(value)
+    elif action.dest == "playlist":
+        from qflashlight.playlist import validate_playlist
+
+        return validate_playlist(value)
+    elif kind in ("geometry", "address"):
+        types = (int, int, int, int) if kind == "geometry" else (str, int)
+        valid = isinstance(value, list) and len(value) == len(types)
+        if not valid or not all(isinstance(item, t) and not isinstance(item, bool) for item, t in zip(value, types)):
+            raise ValueError(f"{action.dest}: not a valid {kind}: {value!r}")
+        return tuple(value)
+    elif kind in ("int", "float", "number", "duration"):
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            raise ValueError(f"{action.dest}: not a number: {value!r}")
+        # the type functions also check the range
+        assert action.type is not None
+        try:
+            return action.type(str(value))  # type: ignore[operator]
+        except (ValueError, argparse.ArgumentTypeError) as err:
+            raise ValueError(f"{action.dest}: {err}") from err
+    else:
+        if not isinstance(value, str):
+            raise ValueError(f"{action.dest}: not a string: {value!r}")
+        if kind == "delimiter" and not value:
+            raise ValueError(f"{action.dest}: empty delimiter")
+        if action.choices is not None and value not in action.choices:
+            raise ValueError(f"{action.dest}: invalid choice: {value!r}")
+        if kind in ("color", "filename", "pattern"):
+            try:
+                action.type(value)  # type: ignore[misc, operator]
+            except (ValueError, argparse.ArgumentTypeError) as err:
+                raise ValueError(f"{action.dest}: {err}") from err
+        return value
+
+
+def args_from_json(values: dict[str, Any]) -> tuple[argparse.Namespace, set[str]]:
+    """The inverse of args_to_json(), raises ValueError on unknown
+    options and values of the wrong type"""
+    parser = make_parser()
+    actions = {action.dest: action for action in parser._actions}  # pylint: disable=protected-access
+
+    args = parser.parse_args([])
+    for dest, value in values.items():
+        if dest not in actions or dest == "help":
+            raise ValueError(f"unknown option: {dest}")
+
+        setattr(args, dest, value_from_json(actions[dest], value))
+    return args, set(values)
+
+
+def forward_args(socket_path: str, args: argparse.Namespace, explicit: set[str]) -> bool:
+    """Hand the options over to the instance listening on 'socket_path',
+    returns False when there is no such instance
+
+    The other instance can't read our stdin and may run in another
+    directory, so FILE is made absolute or replaced by its contents and
+    the --slide files are made absolute in 'args', which can then still
+    be used to start a new instance."""
+    explicit = set(explicit)
+
+    if "slide" in explicit and args.slide is not None:
+        args.slide = [os.path.abspath(filename) for filename in args.slide]
+
+    if "FILE" in explicit:
+        if args.FILE[0] != "-" and (args.watch or args.pager or args.interval is not None):
+            args.FILE = os.path.abspath(args.FILE)
+        else:
+            args.text = read_file_arg(args.FILE, text_limits_from_args(args))
+            args.FILE = None
+            explicit.remove("FILE")
+            explicit.add("text")
 
-def main(argv: list[str]) -> None:
-    args = parse_args(argv[1:])
+    return send_commands(socket_path, [["apply_args", args_to_json(args, explicit)]])
 
-    # allow Ctrl-C to close the app
-    signal.signal(signal.SIGINT, signal.SIG_DFL)
 
-    qapp = QApplication(sys.argv)
-    app = Application()
+def text_limits_from_args(args: argparse.Namespace) -> TextLimits:
+    return TextLimits(args.max_bytes, args.max_lines, args.tail)
 
-    # Style
-    app.set_foreground_color(args.text_color)
-    app.set_background_color(args.color)
-    app.set_font(args.font)
 
-    # Content
-    if args.FILE is None:
-        app.set_text(args.text)
-    else:
-        if args.FILE[0] == "-":
-            text = sys.stdin.read()
+def read_file_arg(filename: str, text_limits: TextLimits) -> str:
+    """The contents of 'filename' or stdin for '-', errors are returned
+    as the text to show, like FileSource does"""
+    try:
+        if filename[0] == "-":
+            text = text_limits.read_file(sys.stdin.buffer)
         else:
-            with open(args.FILE) as fin:
-                text = fin.read()
-        app.set_text(text.rstrip("\n"))
+            with open(filename, "rb") as fin:
+                text = text_limits.read_file(fin)
+    except OSError as err:
+        return str(err)
+    return text.rstrip("\n")
+
+
+def apply_args(app: 'Application', args: argparse.Namespace, explicit: Optional[set[str]] = None) -> None:
+    """Apply the options to 'app', when 'explicit' is given only the
+    options named in it are applied and everything else is left as is"""
+    from PyQt5.QtCore import QRect
+    from PyQt5.QtGui import QColor, QFont
 
-    if args.command is not None:
-        app.set_command(args.command, args.interval)
+    def given(*dests: str) -> bool:
+        return explicit is None or not explicit.isdisjoint(dests)
 
-    if args.fullscreen:
+    # Style
+    if given("text_color"):
+        app.set_foreground_color(QColor(args.text_color or "white"))
+    if given("color"):
+        app.set_background_color(QColor(args.color or "black"))
+    if given("font"):
+        app.set_font(QFont() if args.font is None else QFont(args.font))
+
+    # Content
+    if given("max_bytes", "max_lines", "tail"):
+        app.set_text_limits(text_limits_from_args(args))
+    if given(*CONTENT_ARGS):
+        apply_content_args(app, args)
+
+    # Window
+    if explicit is not None and "fullscreen" in explicit:
+        app.set_fullscreen(args.fullscreen)
+    elif args.fullscreen:
         app.set_fullscreen(True)
 
     if args.borderless:
@@ -128,11 +443,159 @@ def main(argv: list[str]) -> None:
         app.set_cursor_visible(False)
 
     if args.geometry is not None:
-        app.set_window_geometry(args.geometry)
+        app.set_window_geometry(QRect(*args.geometry))
+
+    if args.max_fps is not None:
+        app.set_max_fps(args.max_fps)
+
+    if given("preview_fps"):
+        app.set_preview_fps(args.preview_fps)
+
+    if args.all_screens:
+        app.set_screens([])
+    elif args.screen is not None:
+        app.set_screens(args.screen)
+
+
+def apply_content_args(app: 'Application', args: argparse.Namespace) -> None:
+    from qflashlight.sources import (ClockSource, CountdownSource, FileSource,
+                                     StopwatchSource, WatchedFileSource)
+    from qflashlight.text_generator import OverlapPolicy
+
+    if args.FILE is None:
+        app.set_text(args.text or "")
+    elif args.FILE[0] != "-" and args.pager:
+        app.set_pager(args.FILE, args.page_lines, args.auto_scroll)
+    elif args.FILE[0] != "-" and args.watch:
+        app.set_source(WatchedFileSource(app.flashlight_model().set_text, args.FILE,
+                                         text_limits=app.text_limits()))
+    elif args.FILE[0] != "-" and args.interval is not None:
+        app.set_source(FileSource(app.flashlight_model().set_text, args.FILE, args.interval,
+                                  text_limits=app.text_limits()))
+    else:
+        app.set_text(read_file_arg(args.FILE, app.text_limits()))
+
+    if args.command is not None and args.stream:
+        app.set_stream(args.command,
+                       lines=args.lines,
+                       delimiter=args.delimiter,
+                       max_buffer=args.max_buffer)
+    elif args.command is not None:
+        app.set_command(args.command, args.interval,
+                        timeout_sec=args.timeout,
+                        overlap_policy=OverlapPolicy(args.overlap),
+                        persistent_shell=args.persistent_shell,
+                        align=args.align)
+    elif args.clock is not None:
+        app.set_source(ClockSource(app.flashlight_model().set_text, args.clock,
+                                   args.interval or 1.0))
+    elif args.countdown is not None:
+        app.set_source(CountdownSource(app.flashlight_model().set_text, args.countdown,
+                                       args.interval or 1.0))
+    elif args.stopwatch:
+        app.set_source(StopwatchSource(app.flashlight_model().set_text,
+                                       args.interval or 1.0))
+    elif args.dashboard is not None or args.panel:
+        from qflashlight.dashboard import Dashboard, validate_dashboard
+
+        config = dict(args.dashboard or {})
+        config["panels"] = config.get("panels", []) + [{"command": command} for command in args.panel or []]
+        if args.columns is not None:
+            config["columns"] = args.columns
+        if args.jobs is not None:
+            config["jobs"] = args.jobs
+        app.set_dashboard(Dashboard(validate_dashboard(config),
+                                    default_interval=args.interval,
+                                    default_timeout=args.timeout,
+                                    text_limits=app.text_limits()))
+    elif args.playlist is not None or args.slide:
+        from qflashlight.playlist import Playlist, validate_playlist
+
+        config = dict(args.playlist or {})
+        config["slides"] = config.get("slides", []) + [{"file": filename} for filename in args.slide or []]
+        app.set_source(Playlist(app.flashlight_model(), validate_playlist(config),
+                                default_duration=args.slide_duration,
+                                text_limits=app.text_limits(),
+                                cache_bytes=args.frame_cache * 1024 * 1024))
+    elif args.pattern is not None:
+        from PyQt5.QtGui import QGuiApplication
+
+        from qflashlight.pattern import PatternPlayer, parse_pattern
+
+        rate = args.pattern_rate
+        if rate is None:
+            screen = QGuiApplication.primaryScreen()
+            rate = screen.refreshRate() if screen is not None else 60.0
+        app.set_source(PatternPlayer(app.flashlight_model(), parse_pattern(args.pattern), rate))
+
+
+def main(argv: list[str]) -> None:
+    args = parse_args(argv[1:])
+
+    if args.reuse and args.export is None:
+        if args.control_socket is None:
+            args.control_socket = default_socket_path()
+
+        if forward_args(args.control_socket, args, explicit_args(argv[1:])):
+            sys.exit(0)
+
+    # allow Ctrl-C to close the app
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    if args.export is not None:
+        # no display server needed, but keep an explicitly chosen platform
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    profiler: Optional[cProfile.Profile] = None
+    if args.profile is not None:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    from PyQt5.QtCore import QSize
+    from PyQt5.QtWidgets import QApplication
+
+    from qflashlight.application import Application
+
+    qapp = QApplication(sys.argv)
+    app = Application()
+
+    apply_args(app, args)
+
+    if args.print_stats:
+        app.set_instrumented(True)
+
+    if args.stats_file is not None:
+        app.set_stats_dump(args.stats_file, args.stats_interval)
+
+    if args.control_socket is not None:
+        if not app.listen(args.control_socket):
+            sys.exit(1)
+
+    if args.metrics is not None:
+        if not app.listen_metrics(*args.metrics):
+            sys.exit(1)
+
+    if args.export is not None:
+        if args.geometry is not None:
+            size = QSize(args.geometry[2], args.geometry[3])
+        else:
+            size = QSize(*DEFAULT_EXPORT_SIZE)
+        exporter = app.export_frames(args.export, size, args.export_fps, args.frames)
+        exporter.sig_finished.connect(qapp.quit)
+    else:
+        app.show()
 
     # Run App
-    app.show()
-    sys.exit(qapp.exec_())
+    ret = qapp.exec_()
+
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+
+    if args.print_stats:
+        app.print_stats(sys.stderr)
+
+    sys.exit(ret)
 
 
 def main_entrypoint() -> None:
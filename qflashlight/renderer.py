@@ -0,0 +1,78 @@
+# qflashlight - Simple Qt-based fullscreen flashlight
+# Copyright (C) 2017 Ingo Ruhnke <grumbel@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from typing import Optional, TYPE_CHECKING
+
+import time
+
+from PyQt5.QtCore import QRectF
+from PyQt5.QtGui import QFont, QPainter
+
+from qflashlight.flashlight_model import FlashlightModel
+from qflashlight.stats import PaintStats
+from qflashlight.text_layout import TextLayout, TextLayoutCache
+
+if TYPE_CHECKING:
+    from qflashlight.dashboard import Dashboard
+
+
+class Renderer:
+    """Draws the text of a FlashlightModel or the panels of a Dashboard,
+    shared by the windows and the headless FrameExporter"""
+
+    def __init__(self, layout_cache: Optional[TextLayoutCache] = None,
+                 paint_stats: Optional[PaintStats] = None) -> None:
+        self._layout_cache = layout_cache if layout_cache is not None else TextLayoutCache()
+        self._paint_stats = paint_stats if paint_stats is not None else PaintStats()
+        self._instrumented = False
+
+    def set_instrumented(self, instrumented: bool) -> None:
+        """Record layout timings in the PaintStats"""
+        self._instrumented = instrumented
+
+    def draw(self, painter: QPainter, rect: QRectF, model: FlashlightModel,
+             dashboard: Optional['Dashboard'] = None) -> None:
+        """Draw the content into 'rect', the background of the model is
+        left to the caller"""
+        if dashboard is None:
+            self._draw_text(painter, model, self._layout_cache, rect)
+        else:
+            for panel, panel_rect in zip(dashboard.panels(), dashboard.panel_rects(rect)):
+                painter.fillRect(panel_rect, panel.model().background_color())
+                self._draw_text(painter, panel.model(), panel.layout_cache(), panel_rect)
+
+    def _draw_text(self, painter: QPainter, model: FlashlightModel,
+                   layout_cache: TextLayoutCache, rect: QRectF) -> None:
+        text = model.text()
+        if text:
+            painter.setPen(model.foreground_color())
+            layout = self._text_layout_for(text, model.font(), layout_cache)
+            layout.draw(painter, rect)
+
+    def _text_layout_for(self, text: str, font: QFont, layout_cache: TextLayoutCache) -> TextLayout:
+        layout = layout_cache.get(text, font)
+        if layout is None:
+            if self._instrumented:
+                start = time.perf_counter()
+                layout = TextLayout(text, font)
+                self._paint_stats.add_layout((time.perf_counter() - start) * 1000)
+            else:
+                layout = TextLayout(text, font)
+            layout_cache.put(layout)
+        return layout
+
+
+# EOF #
@@ -0,0 +1,161 @@
+# qflashlight - Simple Qt-based fullscreen flashlight
+# Copyright (C) 2017 Ingo Ruhnke <grumbel@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from typing import Optional
+
+import uuid
+
+from PyQt5.QtCore import QObject, QProcess, pyqtSignal
+
+from qflashlight.process_group import kill_process, start_process_group
+from qflashlight.text_limits import TextLimits
+
+
+def shell_quote(text: str) -> str:
+    return "'" + text.replace("'", "'\\''") + "'"
+
+
+class ShellCoprocess(QObject):
+    """A long-lived /bin/sh that runs one command at a time
+
+    Commands are fed to the shell's stdin, the end of their output is
+    marked by a sentinel line that also carries the exit status. A
+    command that calls 'exit' ends the shell, an EXIT trap still prints
+    the sentinel with its status. The shell is restarted on the next
+    run when it died. Commands share the shell's state, so a 'cd' or
+    variable assignment persists."""
+
+    sig_finished = pyqtSignal(str, int)
+
+    def __init__(self, parent: Optional[QObject] = None,
+                 text_limits: Optional[TextLimits] = None) -> None:
+        super().__init__(parent)
+
+        self._process: Optional[QProcess] = None
+        # output that may still contain the sentinel, everything before it
+        # is moved to the limited '_output'
+        self._buffer = bytearray()
+        self._output = (text_limits if text_limits is not None else TextLimits()).reader()
+        self._sentinel: Optional[bytes] = None
+        self._token = uuid.uuid4().hex
+        self._run_count = 0
+
+    def is_busy(self) -> bool:
+        return self._sentinel is not None
+
+    def run(self, command: str) -> None:
+        assert not self.is_busy()
+
+        if self._process is None:
+            self._start_shell()
+        assert self._process is not None
+
+        self._run_count += 1
+        sentinel = f"__qflashlight_{self._token}_{self._run_count}__"
+        self._sentinel = b"\n" + sentinel.encode() + b" "
+        self._buffer.clear()
+        self._output.clear()
+
+        # 'command eval' keeps syntax errors from terminating the shell
+        script = (f"__qflashlight_sentinel='{sentinel}'\n"
+                  f"command eval {shell_quote(command)} </dev/null 2>&1\n"
+                  "printf '\\n%s %d\\n' \"$__qflashlight_sentinel\" \"$?\"\n")
+        self._process.write(script.encode())
+
+    def kill(self) -> None:
+        """Kill the shell and the command it runs, a pending run is discarded"""
+        self._sentinel = None
+        self._buffer.clear()
+        self._output.clear()
+
+        if self._process is not None:
+            kill_process(self._process)
+            self._process = None
+
+    def _start_shell(self) -> None:
+        process = QProcess(self)
+        process.setProcessChannelMode(QProcess.ProcessChannelMode.MergedChannels)
+        process.readyReadStandardOutput.connect(lambda: self._on_ready_read(process))
+        process.finished.connect(lambda exit_code, exit_status: self._on_shell_finished(process))
+        process.errorOccurred.connect(lambda error: self._on_shell_error(process, error))
+        self._process = process
+
+        # commands run in the shell's process group, killing the group
+        # takes them down together with the shell
+        start_process_group(process, "/bin/sh", ["-s"])
+        # report the status of a command that exits the shell itself
+        process.write(b"trap 'printf \"\\n%s %d\\n\" \"$__qflashlight_sentinel\" \"$?\"' EXIT\n")
+
+    def _on_ready_read(self, process: QProcess) -> None:
+        self._buffer += bytes(process.readAllStandardOutput())
+
+        if self._sentinel is None:
+            # output that doesn't belong to any run
+            self._buffer.clear()
+            return
+
+        idx = self._buffer.find(self._sentinel)
+        if idx == -1:
+            # keep just enough to find a sentinel that arrives split up
+            keep = len(self._sentinel) - 1
+            if len(self._buffer) > keep:
+                self._output.feed(bytes(self._buffer[:-keep]))
+                del self._buffer[:-keep]
+            return
+
+        end = self._buffer.find(b"\n", idx + len(self._sentinel))
+        if end == -1:
+            return
+
+        status = self._buffer[idx + len(self._sentinel):end]
+        self._output.feed(bytes(self._buffer[:idx]))
+        text = self._output.text()
+        if text[-1:] == "\n":
+            text = text[:-1]
+
+        self._sentinel = None
+        self._buffer.clear()
+        self._output.clear()
+
+        self.sig_finished.emit(text, int(status))
+
+    def _on_shell_error(self, process: QProcess, error: QProcess.ProcessError) -> None:
+        if error == QProcess.ProcessError.FailedToStart:
+            self._on_shell_finished(process)
+
+    def _on_shell_finished(self, process: QProcess) -> None:
+        process.deleteLater()
+
+        # pick up output that arrived together with the exit
+        self._on_ready_read(process)
+
+        # the shell died, report what the pending run produced so far
+        self._process = None
+        if self._sentinel is not None:
+            self._output.feed(bytes(self._buffer))
+            text = self._output.text()
+            if text[-1:] == "\n":
+                text = text[:-1]
+
+            self._sentinel = None
+            self._buffer.clear()
+            self._output.clear()
+
+            self.sig_finished.emit(text, -1)
+
+
+# EOF #
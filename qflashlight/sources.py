@@ -0,0 +1,324 @@
+# qflashlight - Simple Qt-based fullscreen flashlight
+# Copyright (C) 2017 Ingo Ruhnke <grumbel@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Text sources that compute their text in-process instead of running
+a command"""
+
+from typing import BinaryIO, Callable, Optional
+
+import math
+import os
+import time
+
+from PyQt5.QtCore import QFileSystemWatcher, QTimer
+
+from qflashlight.interval_timer import IntervalTimer
+from qflashlight.stats import RunningStats
+from qflashlight.text_limits import CHUNK_SIZE, TextLimits
+from qflashlight.text_source import TextSource
+
+# bytes compared at the start and the end of what was read from a watched file
+CHECK_SIZE = 256
+
+
+def format_duration(seconds: float, tenths: bool = False) -> str:
+    seconds = max(0.0, seconds)
+    whole = int(seconds)
+    fraction = f".{int((seconds - whole) * 10)}" if tenths else ""
+
+    hours, rest = divmod(whole, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}{fraction}"
+    else:
+        return f"{minutes:02d}:{secs:02d}{fraction}"
+
+
+def parse_duration(text: str) -> float:
+    """Parse SECONDS, MM:SS or HH:MM:SS"""
+    result = 0.0
+    for part in text.split(":"):
+        value = float(part)
+        if value < 0:
+            raise ValueError(f"invalid duration: {text}")
+        result = result * 60 + value
+    if not math.isfinite(result):
+        raise ValueError(f"invalid duration: {text}")
+    return result
+
+
+class TimerSource(TextSource):
+    """Base for sources that recompute their text on a timer"""
+
+    def __init__(self,
+                 text_callback: Callable[[str], None],
+                 refresh_interval_sec: float,
+                 align: bool = True) -> None:
+        super().__init__(text_callback)
+
+        self._timer = IntervalTimer(refresh_interval_sec, align=align, parent=self)
+        self._timer.sig_timeout.connect(self._update)
+
+    def start(self) -> None:
+        self._update()
+        self._timer.start()
+
+    def stop(self) -> None:
+        self._timer.stop()
+
+    def set_suspended(self, suspended: bool) -> None:
+        if suspended:
+            self._timer.stop()
+        elif not self._timer.is_active():
+            self._update()
+            self._timer.resume()
+
+    def stats(self) -> dict[str, RunningStats]:
+        return {"tick_jitter_ms": self._timer.jitter()}
+
+    def _update(self) -> None:
+        """Recompute the text, called on start(), resume and every tick"""
+
+
+class ClockSource(TimerSource):
+    """Shows the current time formatted with strftime()"""
+
+    def __init__(self,
+                 text_callback: Callable[[str], None],
+                 time_format: str = "%H:%M:%S",
+                 refresh_interval_sec: float = 1.0) -> None:
+        super().__init__(text_callback, refresh_interval_sec)
+
+        self._time_format = time_format
+
+    def _update(self) -> None:
+        self._text_callback(time.strftime(self._time_format))
+
+
+class StopwatchSource(TimerSource):
+    """Shows the time elapsed since start()"""
+
+    def __init__(self,
+                 text_callback: Callable[[str], None],
+                 refresh_interval_sec: float = 1.0) -> None:
+        super().__init__(text_callback, refresh_interval_sec, align=False)
+
+        self._tenths = refresh_interval_sec < 1.0
+        self._start_time: Optional[float] = None
+
+    def start(self) -> None:
+        if self._start_time is None:
+            self._start_time = time.monotonic()
+        super().start()
+
+    def _elapsed(self) -> float:
+        assert self._start_time is not None
+        return time.monotonic() - self._start_time
+
+    def _update(self) -> None:
+        self._text_callback(format_duration(self._elapsed(), self._tenths))
+
+
+class CountdownSource(StopwatchSource):
+    """Counts down from 'duration_sec' to zero"""
+
+    def __init__(self,
+                 text_callback: Callable[[str], None],
+                 duration_sec: float,
+                 refresh_interval_sec: float = 1.0) -> None:
+        super().__init__(text_callback, refresh_interval_sec)
+
+        self._duration_sec = duration_sec
+
+    def _update(self) -> None:
+        remaining = self._duration_sec - self._elapsed()
+        if remaining <= 0:
+            self._timer.stop()
+            self._text_callback(format_duration(0, self._tenths))
+        elif self._tenths:
+            self._text_callback(format_duration(remaining, self._tenths))
+        else:
+            # round up so the display reaches zero exactly at the end
+            self._text_callback(format_duration(remaining + 0.999, self._tenths))
+
+
+class FileSource(TimerSource):
+    """Shows the contents of a file, the file is only read again when
+    its size, modification time or inode changed"""
+
+    def __init__(self,
+                 text_callback: Callable[[str], None],
+                 filename: str,
+                 refresh_interval_sec: float = 1.0,
+                 text_limits: Optional[TextLimits] = None) -> None:
+        super().__init__(text_callback, refresh_interval_sec, align=False)
+
+        self._filename = filename
+        self._signature: Optional[tuple[int, int, int]] = None
+        self._text_limits = text_limits if text_limits is not None else TextLimits()
+
+    def _update(self) -> None:
+        try:
+            st = os.stat(self._filename)
+        except OSError as err:
+            self._signature = None
+            self._text_callback(str(err))
+            return
+
+        signature = (st.st_ino, st.st_size, st.st_mtime_ns)
+        if signature == self._signature:
+            return
+        self._signature = signature
+
+        try:
+            with open(self._filename, "rb") as fin:
+                text = self._text_limits.read_file(fin)
+        except OSError as err:
+            self._text_callback(str(err))
+        else:
+            self._text_callback(text.rstrip("\n"))
+
+
+class WatchedFileSource(TextSource):
+    """Shows the contents of a file and rereads it whenever it changes
+
+    The file's directory is watched as well, so writers that replace
+    the file by renaming a new one over it are picked up. When the file
+    only grew and the bytes read before are unchanged, just the appended
+    bytes are read, otherwise the whole file is read again."""
+
+    def __init__(self,
+                 text_callback: Callable[[str], None],
+                 filename: str,
+                 text_limits: Optional[TextLimits] = None) -> None:
+        super().__init__(text_callback)
+
+        self._filename = os.path.abspath(filename)
+
+        self._inode: Optional[int] = None
+        self._mtime_ns: int = 0
+        self._offset: int = 0
+        # the first and the last bytes up to '_offset', to tell an append
+        # from a rewrite in place
+        self._head: bytes = b""
+        self._tail: bytes = b""
+        self._suspended: bool = False
+        self._text_limits = text_limits if text_limits is not None else TextLimits()
+        self._reader = self._text_limits.reader()
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.fileChanged.connect(self._schedule_update)
+        self._watcher.directoryChanged.connect(self._schedule_update)
+
+        # collapse bursts of change notifications into one read
+        self._update_timer = QTimer(self)
+        self._update_timer.setSingleShot(True)
+        self._update_timer.timeout.connect(self._update)
+
+    def start(self) -> None:
+        self._watcher.addPath(os.path.dirname(self._filename))
+        self._update()
+
+    def stop(self) -> None:
+        self._update_timer.stop()
+        paths = self._watcher.files() + self._watcher.directories()
+        if paths:
+            self._watcher.removePaths(paths)
+
+    def set_suspended(self, suspended: bool) -> None:
+        # changes while suspended are picked up in one go on resume
+        self._suspended = suspended
+        if suspended:
+            self._update_timer.stop()
+        else:
+            self._update()
+
+    def _schedule_update(self, path: str) -> None:
+        if not self._suspended:
+            self._update_timer.start(0)
+
+    def _update(self) -> None:
+        try:
+            st = os.stat(self._filename)
+        except FileNotFoundError:
+            # deleted, wait for the directory to change
+            self._inode = None
+            return
+        except OSError as err:
+            self._inode = None
+            self._text_callback(str(err))
+            return
+
+        # a renamed file drops out of the watcher and has to be re-added
+        if self._filename not in self._watcher.files():
+            self._watcher.addPath(self._filename)
+
+        if st.st_ino == self._inode and st.st_size == self._offset and st.st_mtime_ns == self._mtime_ns:
+            return
+
+        try:
+            with open(self._filename, "rb") as fin:
+                appended = st.st_ino == self._inode and st.st_size > self._offset
+                if not appended or not self._starts_with_what_was_read(fin):
+                    # replaced, truncated or rewritten in place
+                    self._inode = st.st_ino
+                    self._offset = 0
+                    self._reader.clear()
+                self._mtime_ns = st.st_mtime_ns
+
+                max_bytes = self._text_limits.max_bytes()
+                if self._text_limits.tail() and max_bytes is not None and st.st_size - self._offset > max_bytes:
+                    # skip what would be thrown away anyway
+                    self._offset = st.st_size - max_bytes
+                    self._reader.clear()
+                    self._reader.set_truncated()
+
+                fin.seek(self._offset)
+                while not self._reader.is_full():
+                    data = fin.read(CHUNK_SIZE)
+                    if not data:
+                        break
+                    self._offset += len(data)
+                    self._reader.feed(data)
+
+                if self._reader.is_full():
+                    # appended data would be dropped anyway
+                    self._offset = max(self._offset, st.st_size)
+                self._remember_read(fin)
+        except OSError as err:
+            self._inode = None
+            self._text_callback(str(err))
+            return
+
+        self._text_callback(self._reader.text().rstrip("\n"))
+
+    def _starts_with_what_was_read(self, fin: BinaryIO) -> bool:
+        """Whether the first and the last bytes up to '_offset' are still
+        the same, only then new data can be read as an append"""
+        fin.seek(0)
+        if fin.read(len(self._head)) != self._head:
+            return False
+        fin.seek(self._offset - len(self._tail))
+        return fin.read(len(self._tail)) == self._tail
+
+    def _remember_read(self, fin: BinaryIO) -> None:
+        fin.seek(0)
+        self._head = fin.read(min(self._offset, CHECK_SIZE))
+        fin.seek(max(0, self._offset - CHECK_SIZE))
+        self._tail = fin.read(self._offset - fin.tell())
+
+# EOF #
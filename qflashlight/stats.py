@@ -0,0 +1,135 @@
+# qflashlight - Simple Qt-based fullscreen flashlight
+# Copyright (C) 2017 Ingo Ruhnke <grumbel@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from typing import Sequence
+
+from collections import deque
+import bisect
+import math
+import time
+
+
+class RunningStats:
+    """Count, mean, standard deviation and range of a series of values
+    without storing the values themselves"""
+
+    def __init__(self) -> None:
+        self._count: int = 0
+        self._mean: float = 0.0
+        self._m2: float = 0.0
+        self._min: float = math.inf
+        self._max: float = -math.inf
+
+    def add(self, value: float) -> None:
+        # Welford's online algorithm
+        self._count += 1
+        delta = value - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (value - self._mean)
+        self._min = min(self._min, value)
+        self._max = max(self._max, value)
+
+    def count(self) -> int:
+        return self._count
+
+    def mean(self) -> float:
+        return self._mean
+
+    def stddev(self) -> float:
+        if self._count < 2:
+            return 0.0
+        return math.sqrt(self._m2 / (self._count - 1))
+
+    def min(self) -> float:
+        return self._min if self._count else 0.0
+
+    def max(self) -> float:
+        return self._max if self._count else 0.0
+
+    def __str__(self) -> str:
+        return (f"n={self._count} mean={self.mean():.3f} stddev={self.stddev():.3f} "
+                f"min={self.min():.3f} max={self.max():.3f}")
+
+
+# bucket upper bounds in milliseconds, from a fraction of a frame up to slow commands
+DEFAULT_BUCKETS_MS = (0.5, 1, 2.5, 5, 10, 16, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram(RunningStats):
+    """RunningStats that additionally counts the values per bucket"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS_MS) -> None:
+        super().__init__()
+
+        self._bounds: list[float] = sorted(buckets)
+        # the last bucket holds the values above all bounds
+        self._bucket_counts: list[int] = [0] * (len(self._bounds) + 1)
+        self._sum: float = 0.0
+
+    def add(self, value: float) -> None:
+        super().add(value)
+        self._sum += value
+        self._bucket_counts[bisect.bisect_left(self._bounds, value)] += 1
+
+    def sum(self) -> float:
+        return self._sum
+
+    def buckets(self) -> list[tuple[float, int]]:
+        """Cumulative counts of values less than or equal to each bound,
+        ending with (math.inf, count())"""
+        result = []
+        total = 0
+        for bound, count in zip(self._bounds + [math.inf], self._bucket_counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class PaintStats:
+    """Paint and layout timings, shared by all widgets showing the same model"""
+
+    def __init__(self) -> None:
+        self._paint_time = Histogram()
+        self._layout_time = Histogram()
+        self._paint_times: deque[float] = deque()
+
+    def add_paint(self, duration_ms: float) -> None:
+        now = time.monotonic()
+        self._paint_time.add(duration_ms)
+        self._paint_times.append(now)
+        self._expire_paint_times(now)
+
+    def add_layout(self, duration_ms: float) -> None:
+        self._layout_time.add(duration_ms)
+
+    def paints_per_sec(self) -> int:
+        """Number of paints within the last second"""
+        self._expire_paint_times(time.monotonic())
+        return len(self._paint_times)
+
+    def _expire_paint_times(self, now: float) -> None:
+        while self._paint_times and now - self._paint_times[0] > 1.0:
+            self._paint_times.popleft()
+
+    def stats(self) -> dict[str, RunningStats]:
+        return {
+            "paint_ms": self._paint_time,
+            "layout_ms": self._layout_time,
+        }
+
+
+# EOF #
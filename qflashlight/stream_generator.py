@@ -0,0 +1,106 @@
+# qflashlight - Simple Qt-based fullscreen flashlight
+# Copyright (C) 2017 Ingo Ruhnke <grumbel@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from typing import Callable, Optional
+
+from collections import deque
+
+from PyQt5.QtCore import QProcess
+
+from qflashlight.process_group import kill_process, start_process_group
+from qflashlight.text_limits import TextLimits
+from qflashlight.text_source import TextSource
+
+
+class StreamGenerator(TextSource):
+    """Runs a long-lived command and shows its output as it arrives
+
+    Without a delimiter the last 'lines' lines are shown, with a
+    delimiter the output is split into frames and the last complete
+    frame is shown. Incomplete lines or frames are cut down to the
+    last 'max_buffer' bytes. The text that is shown is cut down further
+    to 'text_limits'."""
+
+    def __init__(self,
+                 command: str,
+                 text_callback: Callable[[str], None],
+                 lines: int = 1,
+                 delimiter: Optional[str] = None,
+                 max_buffer: int = 1024 * 1024,
+                 text_limits: Optional[TextLimits] = None) -> None:
+        super().__init__(text_callback)
+
+        self._command = command
+        self._delimiter = b"\n" if delimiter is None else delimiter.encode()
+        self._max_buffer = max_buffer
+        self._keep = 1 if delimiter is not None else lines
+        self._text_limits = text_limits if text_limits is not None else TextLimits()
+
+        self._process: Optional[QProcess] = None
+        self._pending = bytearray()
+        self._last: deque[bytes] = deque(maxlen=self._keep)
+
+    def start(self) -> None:
+        process = QProcess(self)
+        process.setProcessChannelMode(QProcess.ProcessChannelMode.MergedChannels)
+        process.readyReadStandardOutput.connect(lambda: self._on_ready_read(process))
+        process.finished.connect(lambda exit_code, exit_status: self._on_finished(process))
+        self._process = process
+
+        start_process_group(process, "/bin/sh", ["-c", self._command])
+
+    def stop(self) -> None:
+        if self._process is not None:
+            kill_process(self._process)
+            self._process = None
+
+    def _on_ready_read(self, process: QProcess) -> None:
+        self._pending += bytes(process.readAllStandardOutput())
+
+        parts = self._pending.split(self._delimiter)
+        self._pending = parts.pop()
+        if len(self._pending) > self._max_buffer:
+            del self._pending[:-self._max_buffer]
+
+        if parts:
+            for part in parts[-self._keep:]:
+                self._last.append(bytes(part[-self._max_buffer:]))
+            self._emit_text()
+
+    def _on_finished(self, process: QProcess) -> None:
+        self._on_ready_read(process)
+        process.deleteLater()
+        self._process = None
+
+        # show whatever was left without a terminating delimiter
+        if self._pending:
+            self._last.append(bytes(self._pending))
+            self._pending.clear()
+            self._emit_text()
+
+    def _emit_text(self) -> None:
+        data = b"\n".join(self._last)
+        # frames commonly end with a newline before the delimiter
+        if data.endswith(b"\n"):
+            data = data[:-1]
+
+        reader = self._text_limits.reader()
+        reader.feed(data)
+        self._text_callback(reader.text())
+
+
+# EOF #
@@ -21,12 +21,14 @@ from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtWidgets import (QWidget, QDialog, QPlainTextEdit,
                              QDialogButtonBox, QHBoxLayout, QVBoxLayout)
 
+from qflashlight.throttle import Throttle
+
 
 class TextDialog(QDialog):
 
     sig_text_edited = pyqtSignal(str)
 
-    def __init__(self, parent: QWidget) -> None:
+    def __init__(self, parent: QWidget, preview_interval_msec: int = 0) -> None:
         super().__init__(parent)
 
         self.resize(600, 200)
@@ -35,6 +37,9 @@ class TextDialog(QDialog):
 
         self._original_text: str = ""
 
+        # the text is only copied out of the editor when a preview is due
+        self._preview = Throttle(self._emit_text, preview_interval_msec, self)
+
         # widgets
         self._text_edit = QPlainTextEdit(self)
         self._button_box = QDialogButtonBox(self)
@@ -63,20 +68,26 @@ class TextDialog(QDialog):
         self._text_edit.setPlainText(text)
 
     def _on_text_changed(self) -> None:
+        self._preview.trigger()
+
+    def _emit_text(self) -> None:
         self.sig_text_edited.emit(self._text_edit.toPlainText())
 
     def _on_ok_clicked(self) -> None:
+        self._preview.flush()
         self.accept()
 
     def _on_cancel_clicked(self) -> None:
+        self._preview.cancel()
         self.sig_text_edited.emit(self._original_text)
         self.reject()
 
 
 def show_text_dialog(parent: QWidget,
                      text: str,
-                     text_callback: Callable[[str], None]) -> None:
-    dialog = TextDialog(parent)
+                     text_callback: Callable[[str], None],
+                     preview_interval_msec: int = 0) -> None:
+    dialog = TextDialog(parent, preview_interval_msec)
     dialog.set_text(text)
     dialog.sig_text_edited.connect(text_callback)
     dialog.show()
@@ -17,35 +17,258 @@
 
 from typing import Callable, Optional
 
-import subprocess
+from enum import Enum
+import time
 
-from PyQt5.QtCore import QTimer
+from PyQt5.QtCore import QProcess, QTimer
 
+from qflashlight.command_pool import CommandPool
+from qflashlight.interval_timer import IntervalTimer
+from qflashlight.process_group import kill_process, start_process_group
+from qflashlight.shell_coprocess import ShellCoprocess
+from qflashlight.stats import Histogram, RunningStats
+from qflashlight.text_limits import LimitedReader, TextLimits
+from qflashlight.text_source import TextSource
 
-class TextGenerator:
+
+class OverlapPolicy(Enum):
+    """What to do when the refresh timer fires while the previous run
+    of the command is still in progress"""
+
+    SKIP = "skip"    # drop the tick
+    QUEUE = "queue"  # run once more after the current run finished
+    KILL = "kill"    # kill the current run and start a new one
+
+
+class TextGenerator(TextSource):
 
     def __init__(self,
                  command: str,
                  refresh_interval_sec: Optional[float],
-                 text_callback: Callable[[str], None]):
+                 text_callback: Callable[[str], None],
+                 timeout_sec: Optional[float] = None,
+                 overlap_policy: OverlapPolicy = OverlapPolicy.SKIP,
+                 persistent_shell: bool = False,
+                 align: bool = False,
+                 pool: Optional[CommandPool] = None,
+                 phase_sec: float = 0.0,
+                 text_limits: Optional[TextLimits] = None) -> None:
+        super().__init__(text_callback)
+
         self._command = command
         self._refresh_interval_sec = refresh_interval_sec
-        self._text_callback = text_callback
-        self._timer = QTimer()
+        self._timeout_sec = timeout_sec
+        self._overlap_policy = overlap_policy
+
+        self._process: Optional[QProcess] = None
+        self._queued: bool = False
+
+        # output is limited while it is read, not after the run
+        self._text_limits = text_limits if text_limits is not None else TextLimits()
+        self._output: LimitedReader = self._text_limits.reader()
+
+        # runs wait for a free slot in 'pool' and start 'phase_sec'
+        # seconds late, so generators sharing a pool don't start at once
+        self._pool = pool
+        self._phase_sec = phase_sec
+        self._waiting: bool = False
+        self._holds_slot: bool = False
+
+        self._shell: Optional[ShellCoprocess] = None
+        if persistent_shell:
+            self._shell = ShellCoprocess(self, text_limits=self._text_limits)
+            self._shell.sig_finished.connect(self._on_text)
+
+        self._timer: Optional[IntervalTimer] = None
+        if refresh_interval_sec is not None:
+            self._timer = IntervalTimer(refresh_interval_sec, align=align, parent=self)
+            self._timer.sig_timeout.connect(self._on_tick)
+
+        # time from the scheduled tick to the text being available
+        self._latency = RunningStats()
+        self._run_scheduled: Optional[float] = None
+
+        self._wall_time = Histogram()
+        self._run_started: float = 0.0
+        self._counters: dict[str, int] = {name: 0 for name in
+                                          ("runs", "exit_0", "failures", "crashed", "timeouts", "killed")}
+
+        self._timeout_timer = QTimer(self)
+        self._timeout_timer.setSingleShot(True)
+        self._timeout_timer.timeout.connect(self._on_timeout)
+
+    def stats(self) -> dict[str, RunningStats]:
+        stats = {
+            "command_wall_ms": self._wall_time,
+            "update_latency_ms": self._latency,
+        }
+        if self._timer is not None:
+            stats["tick_jitter_ms"] = self._timer.jitter()
+        return stats
+
+    def counters(self) -> dict[str, int]:
+        """Number of runs by exit status and of runs that were killed"""
+        return self._counters
+
+    def counter_group(self) -> str:
+        return "command"
+
+    def _count(self, name: str) -> None:
+        self._counters[name] = self._counters.get(name, 0) + 1
 
     def start(self) -> None:
-        self._run_once()
+        if self._timer is not None and self._phase_sec > 0:
+            # the first run happens on the first tick
+            self._timer.start(self._phase_sec)
+            return
 
-        if self._refresh_interval_sec is not None:
-            self._timer.timeout.connect(self._run_once)
-            self._timer.start(int(self._refresh_interval_sec * 1000))
+        self._start_run()
+
+        if self._timer is not None:
+            self._timer.start()
 
     def stop(self) -> None:
-        self._timer.stop()
+        if self._timer is not None:
+            self._timer.stop()
+        self._queued = False
+        self._kill_run()
+
+        if self._shell is not None:
+            self._shell.kill()
+
+    def set_suspended(self, suspended: bool) -> None:
+        # a run in progress is left to finish, only new ones are held back
+        if self._timer is None:
+            return
+
+        if suspended:
+            self._timer.stop()
+            self._queued = False
+        elif not self._timer.is_active():
+            if not self._is_running():
+                self._start_run()
+            self._timer.resume()
+
+    def _on_tick(self) -> None:
+        assert self._timer is not None
 
-    def _run_once(self) -> None:
-        text = subprocess.getoutput(self._command)
+        if not self._is_running():
+            self._start_run(self._timer.last_tick())
+        elif self._overlap_policy == OverlapPolicy.QUEUE:
+            self._queued = True
+        elif self._overlap_policy == OverlapPolicy.KILL:
+            self._count("killed")
+            self._kill_run()
+            self._start_run(self._timer.last_tick())
+        else:  # OverlapPolicy.SKIP
+            pass
+
+    def _on_timeout(self) -> None:
+        self._count("timeouts")
+        self._kill_run()
+
+    def _is_running(self) -> bool:
+        if self._waiting:
+            return True
+        elif self._shell is not None:
+            return self._shell.is_busy()
+        else:
+            return self._process is not None
+
+    def _start_run(self, scheduled: Optional[float] = None) -> None:
+        self._run_scheduled = scheduled
+
+        if self._pool is not None:
+            self._waiting = True
+            self._pool.request(self, self._begin_run)
+        else:
+            self._begin_run()
+
+    def _begin_run(self) -> None:
+        self._waiting = False
+        self._holds_slot = self._pool is not None
+        self._run_started = time.perf_counter()
+
+        if self._shell is not None:
+            self._shell.run(self._command)
+        else:
+            self._start_process()
+
+        if self._timeout_sec is not None:
+            self._timeout_timer.start(int(self._timeout_sec * 1000))
+
+    def _kill_run(self) -> None:
+        """Kill the running command, its output will be discarded"""
+        self._timeout_timer.stop()
+
+        if self._waiting:
+            assert self._pool is not None
+            self._waiting = False
+            self._pool.cancel(self)
+
+        if self._shell is not None:
+            if self._shell.is_busy():
+                self._shell.kill()
+        elif self._process is not None:
+            kill_process(self._process)
+            self._process = None
+
+        self._release_slot()
+
+    def _release_slot(self) -> None:
+        if self._holds_slot:
+            assert self._pool is not None
+            self._holds_slot = False
+            self._pool.release()
+
+    def _start_process(self) -> None:
+        process = QProcess(self)
+        process.setProcessChannelMode(QProcess.ProcessChannelMode.MergedChannels)
+        process.readyReadStandardOutput.connect(lambda: self._on_ready_read(process))
+        process.finished.connect(lambda exit_code, exit_status: self._on_finished(process, exit_code, exit_status))
+        process.errorOccurred.connect(lambda error: self._on_error(process, error))
+        self._process = process
+        self._output.clear()
+
+        start_process_group(process, "/bin/sh", ["-c", self._command])
+
+    def _on_ready_read(self, process: QProcess) -> None:
+        # output beyond the limits is read and dropped to keep the command going
+        self._output.feed(bytes(process.readAllStandardOutput()))
+
+    def _on_error(self, process: QProcess, error: QProcess.ProcessError) -> None:
+        # 'finished' is not emitted when the process couldn't be started
+        if error == QProcess.ProcessError.FailedToStart:
+            self._on_finished(process, -1, QProcess.ExitStatus.CrashExit)
+
+    def _on_finished(self, process: QProcess, exit_code: int, exit_status: QProcess.ExitStatus) -> None:
+        process.deleteLater()
+        self._process = None
+
+        self._on_ready_read(process)
+        text = self._output.text()
+        self._output.clear()
+        # strip the trailing newline like subprocess.getoutput() does
+        if text[-1:] == "\n":
+            text = text[:-1]
+        self._on_text(text, exit_code if exit_status == QProcess.ExitStatus.NormalExit else -1)
+
+    def _on_text(self, text: str, exit_code: int) -> None:
+        self._timeout_timer.stop()
+        self._release_slot()
+        self._wall_time.add((time.perf_counter() - self._run_started) * 1000)
+        self._count("runs")
+        self._count(f"exit_{exit_code}" if exit_code >= 0 else "crashed")
+        if exit_code != 0:
+            self._count("failures")
         self._text_callback(text)
 
+        if self._run_scheduled is not None and self._timer is not None:
+            self._latency.add((self._timer.clock() - self._run_scheduled) * 1000)
+
+        if self._queued:
+            self._queued = False
+            self._start_run()
+
 
 # EOF #
@@ -0,0 +1,122 @@
+# qflashlight - Simple Qt-based fullscreen flashlight
+# Copyright (C) 2017 Ingo Ruhnke <grumbel@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from typing import Optional
+
+from PyQt5.QtCore import QPointF, QRectF
+from PyQt5.QtGui import QFont, QFontMetricsF, QPainter, QTextLayout
+
+
+# upper limit of cached placements, more than any multi-head setup needs
+MAX_PLACEMENTS = 16
+
+
+class TextLayout:
+    """Text that is shaped once and then drawn centered and scaled to
+    fit into arbitrary rectangles"""
+
+    def __init__(self, text: str, font: QFont) -> None:
+        self._text = text
+        self._font_key = font.key()
+
+        fm = QFontMetricsF(font)
+        line_spacing = fm.lineSpacing()
+
+        self._lines: list[QTextLayout] = []
+        self._width = 0.0
+        for y, line in enumerate(text.split("\n")):
+            # QPainter.drawText() without Qt.TextExpandTabs shows a tab
+            # as a single space, QTextLayout would jump to a tab stop
+            # 80 pixels away instead
+            layout = QTextLayout(line.replace("\t", " "), font)
+            layout.setCacheEnabled(True)
+            layout.beginLayout()
+            text_line = layout.createLine()
+            text_line.setLineWidth(1e9)
+            text_line.setPosition(QPointF(0, y * line_spacing))
+            layout.endLayout()
+
+            self._width = max(self._width, text_line.naturalTextWidth())
+            self._lines.append(layout)
+
+        self._height = (len(self._lines) - 1) * line_spacing + fm.height()
+
+        # scale and line offsets per rectangle size, one for each screen
+        self._placements: dict[tuple[float, float], tuple[float, list[QPointF]]] = {}
+
+    def matches(self, text: str, font: QFont) -> bool:
+        return self._text == text and self._font_key == font.key()
+
+    def draw(self, painter: QPainter, rect: QRectF) -> None:
+        key = (rect.width(), rect.height())
+        placement = self._placements.get(key)
+        if placement is None:
+            if len(self._placements) >= MAX_PLACEMENTS:
+                self._placements.clear()
+            placement = self._place(rect)
+            self._placements[key] = placement
+
+        scale, offsets = placement
+        if scale <= 0:
+            return
+
+        painter.save()
+        painter.translate(rect.topLeft())
+        painter.scale(scale, scale)
+        for layout, offset in zip(self._lines, offsets):
+            layout.draw(painter, offset)
+        painter.restore()
+
+    def _place(self, rect: QRectF) -> tuple[float, list[QPointF]]:
+        if self._width == 0 or rect.height() == 0:
+            src_aspect = 0.0
+        else:
+            src_aspect = self._width / self._height
+        dst_aspect = rect.width() / rect.height() if rect.height() != 0 else 0.0
+
+        if src_aspect > dst_aspect:
+            scale = rect.width() / self._width
+        else:
+            scale = rect.height() / self._height
+
+        if scale <= 0:
+            return (scale, [])
+
+        # center every line horizontally and the block vertically
+        width = rect.width() / scale
+        top = (rect.height() / scale - self._height) / 2
+        return (scale, [QPointF((width - layout.lineAt(0).naturalTextWidth()) / 2, top)
+                        for layout in self._lines])
+
+
+class TextLayoutCache:
+    """Holds the TextLayout of the current text, so that widgets showing
+    the same text on different screens shape it only once"""
+
+    def __init__(self) -> None:
+        self._layout: Optional[TextLayout] = None
+
+    def get(self, text: str, font: QFont) -> Optional[TextLayout]:
+        if self._layout is not None and self._layout.matches(text, font):
+            return self._layout
+        return None
+
+    def put(self, layout: TextLayout) -> None:
+        self._layout = layout
+
+
+# EOF #
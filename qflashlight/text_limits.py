@@ -0,0 +1,189 @@
+# qflashlight - Simple Qt-based fullscreen flashlight
+# Copyright (C) 2017 Ingo Ruhnke <grumbel@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from typing import BinaryIO, Optional
+
+import codecs
+import io
+import os
+
+
+# size of the reads from files and of the slack a tail buffer may
+# collect before it is trimmed
+CHUNK_SIZE = 64 * 1024
+
+
+class TextLimits:
+    """Upper bounds for the amount of text that is kept and laid out
+
+    The limits are applied while the text is read, so neither memory
+    use nor layout cost depend on the size of the input. Without 'tail'
+    the first 'max_bytes' bytes and 'max_lines' lines are kept,
+    otherwise the last ones."""
+
+    def __init__(self, max_bytes: Optional[int] = None, max_lines: Optional[int] = None,
+                 tail: bool = False) -> None:
+        self._max_bytes = max_bytes
+        self._max_lines = max_lines
+        self._tail = tail
+
+    def max_bytes(self) -> Optional[int]:
+        return self._max_bytes
+
+    def max_lines(self) -> Optional[int]:
+        return self._max_lines
+
+    def tail(self) -> bool:
+        return self._tail
+
+    def is_unlimited(self) -> bool:
+        return self._max_bytes is None and self._max_lines is None
+
+    def reader(self) -> 'LimitedReader':
+        return LimitedReader(self)
+
+    def apply(self, text: str) -> str:
+        if self.is_unlimited():
+            return text
+
+        reader = self.reader()
+        reader.feed(text.encode("utf-8", errors="surrogatepass"))
+        return reader.text()
+
+    def read_file(self, fin: BinaryIO) -> str:
+        """Read 'fin' in chunks, stopping as soon as nothing more would be kept"""
+        reader = self.reader()
+
+        if self._tail and self._max_bytes is not None and fin.seekable():
+            # skip what would be thrown away anyway
+            try:
+                size = os.fstat(fin.fileno()).st_size
+            except (OSError, io.UnsupportedOperation):
+                size = 0
+            if size > self._max_bytes:
+                fin.seek(size - self._max_bytes)
+                reader.set_truncated()
+
+        while not reader.is_full():
+            data = fin.read(CHUNK_SIZE)
+            if not data:
+                break
+            reader.feed(data)
+
+        return reader.text()
+
+
+class LimitedReader:
+    """Collects chunks of bytes, keeping only what TextLimits allow"""
+
+    def __init__(self, limits: TextLimits) -> None:
+        self._max_bytes = limits.max_bytes()
+        self._max_lines = limits.max_lines()
+        self._tail = limits.tail()
+
+        self._buffer = bytearray()
+        # newlines in the buffer, only counted for the head
+        self._newlines: int = 0
+        # bytes added since the last trim of the tail
+        self._slack: int = 0
+        self._full: bool = False
+        self._truncated: bool = False
+
+    def is_full(self) -> bool:
+        """True when further input would be discarded"""
+        return self._full
+
+    def set_truncated(self) -> None:
+        """Mark the input as not starting at the beginning"""
+        self._truncated = True
+
+    def clear(self) -> None:
+        self._buffer.clear()
+        self._newlines = 0
+        self._slack = 0
+        self._full = False
+        self._truncated = False
+
+    def feed(self, data: bytes) -> None:
+        if self._tail:
+            self._feed_tail(data)
+        else:
+            self._feed_head(data)
+
+    def _feed_head(self, data: bytes) -> None:
+        if self._full:
+            return
+
+        if self._max_bytes is not None and len(self._buffer) + len(data) >= self._max_bytes:
+            data = data[:self._max_bytes - len(self._buffer)]
+            self._full = True
+
+        if self._max_lines is not None:
+            newlines = data.count(b"\n")
+            if self._newlines + newlines >= self._max_lines:
+                # cut at the newline that ends the last line that is kept
+                pos = -1
+                for _ in range(self._max_lines - self._newlines):
+                    pos = data.find(b"\n", pos + 1)
+                data = data[:pos]
+                newlines = self._max_lines - self._newlines - 1
+                self._full = True
+            self._newlines += newlines
+
+        self._buffer += data
+
+    def _feed_tail(self, data: bytes) -> None:
+        self._buffer += data
+        self._slack += len(data)
+        if self._slack > max(CHUNK_SIZE, self._max_bytes or 0):
+            self._trim_tail()
+
+    def _trim_tail(self) -> None:
+        self._slack = 0
+
+        if self._max_bytes is not None and len(self._buffer) > self._max_bytes:
+            del self._buffer[:len(self._buffer) - self._max_bytes]
+            self._truncated = True
+
+        if self._max_lines is not None:
+            # a trailing newline doesn't start another line
+            pos = len(self._buffer) - 1 if self._buffer.endswith(b"\n") else len(self._buffer)
+            for _ in range(self._max_lines):
+                pos = self._buffer.rfind(b"\n", 0, pos)
+                if pos == -1:
+                    return
+            del self._buffer[:pos + 1]
+            self._truncated = True
+
+    def text(self) -> str:
+        if self._tail:
+            self._trim_tail()
+
+        data = bytes(self._buffer)
+        if self._tail and self._truncated:
+            # don't start in the middle of a character
+            start = 0
+            while start < min(len(data), 3) and data[start] & 0xC0 == 0x80:
+                start += 1
+            return data[start:].decode("utf-8", errors="replace")
+        elif self._full:
+            # drop a character that was cut in half, but nothing else
+            return codecs.getincrementaldecoder("utf-8")(errors="replace").decode(data, final=False)
+        else:
+            return data.decode("utf-8", errors="replace")
+
+
+# EOF #
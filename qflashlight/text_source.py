@@ -0,0 +1,65 @@
+# qflashlight - Simple Qt-based fullscreen flashlight
+# Copyright (C) 2017 Ingo Ruhnke <grumbel@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from typing import Callable, Optional
+
+from PyQt5.QtCore import QObject, QSize
+from PyQt5.QtGui import QImage
+
+from qflashlight.stats import RunningStats
+
+
+class TextSource(QObject):
+    """Base class for everything that produces the text to display,
+    new text is handed to 'text_callback' once start() was called"""
+
+    def __init__(self, text_callback: Callable[[str], None]) -> None:
+        super().__init__()
+
+        self._text_callback = text_callback
+
+    def start(self) -> None:
+        """Begin producing text, the first text should follow right away"""
+
+    def stop(self) -> None:
+        """Stop producing text, 'text_callback' is not called afterwards"""
+
+    def stats(self) -> dict[str, RunningStats]:
+        return {}
+
+    def counters(self) -> dict[str, int]:
+        """Event counts, every counter is present from the start"""
+        return {}
+
+    def counter_group(self) -> str:
+        """The kind of source, the counters are named after it in the metrics"""
+        return "source"
+
+    def frame(self, size: QSize, device_pixel_ratio: float = 1.0) -> Optional[QImage]:
+        """A pre-rendered image of the whole window at 'size', None when
+        the text has to be drawn the usual way"""
+        return None
+
+    def painted(self) -> None:
+        """Called by the windows whenever they showed the current text"""
+
+    def set_suspended(self, suspended: bool) -> None:
+        """Pause the work that only matters while the text can be seen,
+        when resumed the text has to be brought up to date right away"""
+
+
+# EOF #
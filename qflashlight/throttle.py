@@ -0,0 +1,70 @@
+# qflashlight - Simple Qt-based fullscreen flashlight
+# Copyright (C) 2017 Ingo Ruhnke <grumbel@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from typing import Callable, Optional
+
+from PyQt5.QtCore import QObject, QTimer
+
+
+class Throttle(QObject):
+    """Calls 'callback' at most once per 'interval_msec'
+
+    The first trigger() calls it right away, triggers within the
+    interval are collapsed into a single trailing call at its end, so
+    the last state is always delivered. The callback takes no
+    arguments and fetches the current state itself, so skipped
+    triggers cost nothing."""
+
+    def __init__(self, callback: Callable[[], None], interval_msec: int,
+                 parent: Optional[QObject] = None) -> None:
+        super().__init__(parent)
+
+        self._callback = callback
+        self._pending: bool = False
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(max(0, interval_msec))
+        self._timer.timeout.connect(self._on_timeout)
+
+    def trigger(self) -> None:
+        if self._timer.isActive():
+            self._pending = True
+        else:
+            self._callback()
+            self._timer.start()
+
+    def flush(self) -> None:
+        """Deliver a pending call now"""
+        self._timer.stop()
+        if self._pending:
+            self._pending = False
+            self._callback()
+
+    def cancel(self) -> None:
+        """Drop a pending call"""
+        self._timer.stop()
+        self._pending = False
+
+    def _on_timeout(self) -> None:
+        if self._pending:
+            self._pending = False
+            self._callback()
+            # keep the rate for triggers that follow right away
+            self._timer.start()
+
+
+# EOF #